@@ -0,0 +1 @@
+'''This module contains benchmarks for the macro, library and recording modules. Run them from the repository root, e.g. python -m benchmarks.recorder_callbacks.'''
\ No newline at end of file
@@ -0,0 +1,51 @@
+'''Compares two benchmark result files. Usage: python -m benchmarks.compare old.json new.json [--threshold 0.1]'''
+
+import argparse
+import json
+
+def _flatten(results:dict, prefix:str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def _higher_is_better(name:str) -> bool:
+    return name.endswith("_per_s")
+
+def compare(old:dict, new:dict, threshold:float) -> list[tuple[str, float, float, float, bool]]:
+    '''Returns (metric, old, new, relative change, is regression) for every metric present in both result sets.'''
+    old_flat, new_flat = _flatten(old["results"]), _flatten(new["results"])
+    rows = []
+    for name in sorted(old_flat.keys() & new_flat.keys()):
+        before, after = old_flat[name], new_flat[name]
+        if before == 0:
+            continue
+        change = (after - before) / abs(before)
+        worse = -change if _higher_is_better(name) else change
+        rows.append((name, before, after, change, worse > threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.old) as file:
+        old = json.load(file)
+    with open(args.new) as file:
+        new = json.load(file)
+    rows = compare(old, new, args.threshold)
+    for name, before, after, change, regression in rows:
+        print(f'{"REGRESSION " if regression else ""}{name}: {before:.6g} -> {after:.6g} ({change:+.1%})')
+    regressions = sum(1 for row in rows if row[4])
+    print(f'{regressions} regression(s) beyond {args.threshold:.0%} between {old["label"]} and {new["label"]}')
+    raise SystemExit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+'''Measures the cost of one ActionRecorder listener callback, i.e. the time the OS input hook is held up per event.'''
+
+from recording import ActionRecorder, MoveSamplingPolicy
+from pynput import mouse, keyboard
+import time
+
+EVENTS = 200_000 #calls per callback
+
+def time_callback(callback, args:tuple, events:int = EVENTS) -> float:
+    '''Calls callback(*args) events times and returns the mean cost per call in nanoseconds.'''
+    start = time.perf_counter_ns()
+    for _ in range(events):
+        callback(*args)
+    return (time.perf_counter_ns() - start) / events
+
+def time_moves(recorder:ActionRecorder, events:int = EVENTS) -> float:
+    '''Feeds recorder._on_move a diagonal sweep, one pixel per call, and returns the mean cost per call in nanoseconds, including the throttle and the bookkeeping of skipped movements.'''
+    points = [(index % 1000, index % 1000) for index in range(events)]
+    on_move = recorder._on_move
+    start = time.perf_counter_ns()
+    for x, y in points:
+        on_move(x, y)
+    return (time.perf_counter_ns() - start) / events
+
+def _move_recorder(policy:MoveSamplingPolicy) -> ActionRecorder:
+    recorder = ActionRecorder(record_moves=True, move_policy=policy)
+    recorder._move_interval_ns = int(policy.min_interval * 1e9) #normally set by _record()
+    recorder._move_distance = policy.min_distance
+    recorder._start_time = time.perf_counter_ns()
+    return recorder
+
+def run(events:int = EVENTS) -> dict:
+    '''Returns the mean nanoseconds per event for each recorder callback. Callbacks are called directly, so no listener or display is needed.'''
+    recorder = ActionRecorder()
+    recorder._start_time = time.perf_counter_ns()
+    key = keyboard.KeyCode.from_char("a")
+    results = {
+        "on_press_ns": time_callback(recorder._on_press, (key,), events),
+        "on_release_ns": time_callback(recorder._on_release, (key,), events),
+        "on_click_ns": time_callback(recorder._on_click, (100, 200, mouse.Button.left, True), events),
+    }
+    start = time.perf_counter_ns()
+    store = recorder.retrieve_record()
+    results["retrieve_record_ns_per_event"] = (time.perf_counter_ns() - start) / max(len(store), 1)
+
+    results["on_move_ns"] = time_moves(_move_recorder(MoveSamplingPolicy()), events) #mostly throttled
+    recorder = _move_recorder(MoveSamplingPolicy(min_interval=0, min_distance=0)) #every movement recorded
+    results["on_move_unthrottled_ns"] = time_moves(recorder, events)
+    start = time.perf_counter_ns()
+    recorder.retrieve_record()
+    results["simplify_moves_ns_per_event"] = (time.perf_counter_ns() - start) / events
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f'{name}: {value:.0f}')
\ No newline at end of file
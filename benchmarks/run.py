@@ -0,0 +1,195 @@
+'''Runs the benchmark suite and saves the results as JSON. Usage: python -m benchmarks.run [--sizes 1000 10000] [--label name] [--output path]'''
+
+from macro import ActionManager, DeadlineScheduler, VirtualClock, PlaybackTelemetry, InputManager, RecordingBackend, Action, str_to_key
+from library import MacroLibrary
+from library.binary_helpers import save_as_binary, EXTENSION
+from library.macro_archive import METHODS, EXTENSION as ARCHIVE_EXTENSION
+from library.persistence import PersistenceWorker
+from . import recorder_callbacks
+from .synthetic import SIZES, synthetic_store, dense_store
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+EDITS = 1_000 #add/remove operations timed per size
+PLAYBACK_ACTIONS = 2_000 #actions in the real time playback benchmark
+PLAYBACK_DURATION = 2.0 #seconds the playback benchmark runs for
+LIBRARY_SIZES = (10, 100, 500) #macro files in the startup benchmark
+LIBRARY_MACRO_SIZE = 1_000 #actions per file in the startup benchmark
+ARCHIVE_MACROS = 100 #macros of LIBRARY_MACRO_SIZE actions moved in the archive benchmark
+
+def _timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def _percentile(values:list[float], share:float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(share * len(ordered)), len(ordered) - 1)]
+
+def bench_playback() -> dict:
+    '''Scheduling lateness and CPU time of real time playback for each scheduler profile.'''
+    results = {}
+    for profile in DeadlineScheduler.PROFILES:
+        manager = ActionManager(dense_store(PLAYBACK_ACTIONS, PLAYBACK_DURATION), scheduler=DeadlineScheduler(profile))
+        cpu_start = time.process_time()
+        wall, _ = _timed(manager._run)
+        cpu = time.process_time() - cpu_start
+        lateness = list(manager.lateness)
+        results[profile] = {
+            "actions": len(lateness),
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "cpu_share": cpu / wall,
+            "lateness_mean_us": statistics.fmean(lateness) * 1e6,
+            "lateness_p99_us": _percentile(lateness, 0.99) * 1e6,
+            "lateness_max_us": max(lateness) * 1e6,
+        }
+    return results
+
+def bench_telemetry(size:int) -> dict:
+    '''Per action cost of simulated playback with and without PlaybackTelemetry attached.'''
+    manager = ActionManager(synthetic_store(size))
+    manager._compile()
+    plain_s, _ = _timed(VirtualClock().simulate, manager)
+    manager.telemetry = PlaybackTelemetry()
+    instrumented_s, _ = _timed(VirtualClock().simulate, manager)
+    return {"plain_per_action_us": plain_s / size * 1e6, "telemetry_per_action_us": instrumented_s / size * 1e6}
+
+def bench_edits(size:int) -> dict:
+    '''Cost of compiling a playback plan (what _reset used to rebuild) and of single add_action/remove_action calls.'''
+    manager = ActionManager(synthetic_store(size))
+    compile_s, _ = _timed(manager._compile)
+    generator = random.Random(1)
+    duration = manager.save.timestamps[-1]
+    actions = [Action("key_down", str_to_key("z"), generator.uniform(0, duration)) for _ in range(EDITS)]
+    add_s, _ = _timed(lambda: [manager.add_action(action) for action in actions])
+    remove_s, _ = _timed(lambda: [manager.remove_action(action) for action in actions])
+    return {"compile_s": compile_s, "add_action_us": add_s / EDITS * 1e6, "remove_action_us": remove_s / EDITS * 1e6}
+
+def bench_serialization(size:int) -> dict:
+    '''Throughput of to_dict_list and from_dict_list.'''
+    manager = ActionManager(synthetic_store(size))
+    to_s, data = _timed(manager.to_dict_list)
+    from_s, _ = _timed(ActionManager.from_dict_list, data)
+    return {"to_dict_list_actions_per_s": size / to_s, "from_dict_list_actions_per_s": size / from_s}
+
+def bench_save_retrieve(size:int) -> dict:
+    '''Latency of save_macro (queueing the write), of the background write itself, of retrieve_macro before and after the macro is cached and of reading the first streamed action.'''
+    folder = tempfile.mkdtemp()
+    try:
+        library = MacroLibrary(folder)
+        store = synthetic_store(size)
+        save_s, _ = _timed(library.save_macro, store, "bench", True)
+        flush_s, _ = _timed(library.flush)
+        retrieve_s, _ = _timed(library.retrieve_macro, "bench")
+        cached_s, _ = _timed(library.retrieve_macro, "bench")
+        first_s, _ = _timed(lambda: next(iter(library.stream_macro("bench"))))
+        return {"save_macro_s": save_s, "flush_s": flush_s, "retrieve_macro_s": retrieve_s, "retrieve_cached_s": cached_s, "stream_first_action_s": first_s, "file_bytes": os.path.getsize(library.index["bench"])}
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+def bench_library_startup() -> dict:
+    '''MacroLibrary construction time (_fix_index) against the number of saved macros, with a cold and a warm index manifest.'''
+    results = {}
+    store = synthetic_store(LIBRARY_MACRO_SIZE)
+    for count in LIBRARY_SIZES:
+        folder = tempfile.mkdtemp()
+        try:
+            for index in range(count): #written directly, save_macro would also rewrite the manifest each time
+                save_as_binary(store, os.path.join(folder, f'macro{index}{EXTENSION}'))
+            cold_s, library = _timed(MacroLibrary, folder)
+            library.flush() #the warm run must find the manifest the cold run wrote
+            warm_s, library = _timed(MacroLibrary, folder)
+            library.flush()
+            results[str(count)] = {"cold_s": cold_s, "warm_s": warm_s}
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+def bench_archive() -> dict:
+    '''Bytes and time to move a library between two folders as one JSON file per macro and as one archive per compression method.'''
+    source = tempfile.mkdtemp()
+    try:
+        library = MacroLibrary(source)
+        for index in range(ARCHIVE_MACROS):
+            library.save_macro(synthetic_store(LIBRARY_MACRO_SIZE, seed=index), f'macro{index}')
+        names = sorted(library.index)
+        results = {}
+
+        folder, target = tempfile.mkdtemp(), tempfile.mkdtemp()
+        try:
+            paths = [os.path.join(folder, f'{name}.json') for name in names]
+            export_s, _ = _timed(lambda: [library.export_json(name, path) for name, path in zip(names, paths)])
+            destination = MacroLibrary(target)
+            import_s, _ = _timed(lambda: ([destination.import_json(path, name) for name, path in zip(names, paths)], destination.flush()))
+            results["json"] = {"bytes": sum(os.path.getsize(path) for path in paths), "export_s": export_s, "import_s": import_s}
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+            shutil.rmtree(target, ignore_errors=True)
+
+        for method in METHODS:
+            folder, target = tempfile.mkdtemp(), tempfile.mkdtemp()
+            try:
+                path = os.path.join(folder, f'library{ARCHIVE_EXTENSION}')
+                export_s, _ = _timed(library.export_archive, path, names, method)
+                destination = MacroLibrary(target)
+                import_s, _ = _timed(lambda: (destination.import_archive(path), destination.flush()))
+                results[method] = {"bytes": os.path.getsize(path), "export_s": export_s, "import_s": import_s}
+            finally:
+                shutil.rmtree(folder, ignore_errors=True)
+                shutil.rmtree(target, ignore_errors=True)
+        return results
+    finally:
+        PersistenceWorker.shared().flush() #nothing may still be writing into the folder
+        shutil.rmtree(source, ignore_errors=True)
+
+def run(sizes:tuple[int, ...] = SIZES) -> dict:
+    '''Runs every benchmark with input events going to a counting RecordingBackend, so no display is needed.'''
+    previous = InputManager.set_backend(RecordingBackend(record=False))
+    try:
+        results = {
+            "playback": bench_playback(),
+            "library_startup": bench_library_startup(),
+            "archive": bench_archive(),
+            "recorder_callbacks": recorder_callbacks.run(),
+        }
+        for size in sizes:
+            results[f'edits_{size}'] = bench_edits(size)
+            results[f'serialization_{size}'] = bench_serialization(size)
+            results[f'save_retrieve_{size}'] = bench_save_retrieve(size)
+            results[f'telemetry_{size}'] = bench_telemetry(size)
+    finally:
+        InputManager.set_backend(previous)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="synthetic macro sizes in actions")
+    parser.add_argument("--label", default=time.strftime("%Y%m%d-%H%M%S"), help="name stored with the results, e.g. a version")
+    parser.add_argument("--output", default=None, help="results file, defaults to benchmarks/results/<label>.json")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", f'{args.label}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report = {
+        "label": args.label,
+        "python": sys.version,
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sizes": args.sizes,
+        "results": run(tuple(args.sizes)),
+    }
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f'Results saved to {output}')
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,54 @@
+'''Generators for reproducible synthetic macros.'''
+
+from macro import ActionStore, str_to_key
+from pynput import mouse
+import random
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000) #action counts the suite covers
+KEYS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+def synthetic_store(count:int, seed:int = 0, rate:float = 50.0, mouse_share:float = 0.3, move_share:float = 0.3) -> ActionStore:
+    '''
+    Returns a sorted ActionStore of exactly count actions made of key presses, clicks and cursor movements.
+
+    :param count: number of actions.
+    :type count: int
+    :param seed: random seed, the same seed always gives the same macro.
+    :type seed: int
+    :param rate: average actions per second, sets the macro's duration.
+    :type rate: float
+    :param mouse_share: share of down/up pairs that are clicks rather than key presses.
+    :type mouse_share: float
+    :param move_share: share of actions that are cursor movements.
+    :type move_share: float
+    '''
+    generator = random.Random(seed)
+    keys = [str_to_key(char) for char in KEYS]
+    store = ActionStore()
+    timestamp = 0.0
+    while len(store) < count:
+        timestamp += generator.expovariate(rate)
+        if generator.random() < move_share or len(store) == count - 1: #a lone slot left can't hold a pair
+            store.append_values("mouse_move", None, timestamp, (generator.randrange(1920), generator.randrange(1080)))
+            continue
+        hold = generator.uniform(0.02, 0.15)
+        if generator.random() < mouse_share:
+            location = (generator.randrange(1920), generator.randrange(1080))
+            store.append_values("mouse_down", mouse.Button.left, timestamp, location)
+            store.append_values("mouse_up", mouse.Button.left, timestamp + hold, location)
+        else:
+            key = generator.choice(keys)
+            store.append_values("key_down", key, timestamp)
+            store.append_values("key_up", key, timestamp + hold)
+    store.sort()
+    return store
+
+def dense_store(count:int, duration:float, seed:int = 0) -> ActionStore:
+    '''Returns count key actions spread evenly over duration seconds, for measuring scheduling lateness in real time.'''
+    generator = random.Random(seed)
+    keys = [str_to_key(char) for char in KEYS]
+    store = ActionStore()
+    for index in range(count):
+        key = generator.choice(keys)
+        store.append_values("key_down" if index % 2 == 0 else "key_up", key, duration * index / count)
+    return store
\ No newline at end of file
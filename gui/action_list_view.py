@@ -0,0 +1,152 @@
+import tkinter as tk
+from tkinter import font as tkfont
+from macro import ActionManager, input_to_str
+
+class ActionListView(tk.Frame):
+    '''Virtualized list of a macro's actions: the Listbox only ever holds the rows that fit on screen, and edits reported by the ActionManager redraw just those rows. Generates <<ActionSelect>> when the user selects an action.'''
+
+    def __init__(self, master, **kwargs):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param master: parent widget.
+        :param kwargs: passed on to tk.Frame.
+        '''
+        super().__init__(master, **kwargs)
+        self.manager = None #ActionManager being shown, set with set_manager()
+        self.top = 0 #index of the action in the first visible row
+        self.rows = 1 #number of rows that fit in the Listbox
+        self.selected = None #index of the selected action, kept while it is scrolled out of view
+
+        self.listbox = tk.Listbox(self, exportselection=False, activestyle="none")
+        self.scrollbar = tk.Scrollbar(self, command=self._on_scroll)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="left", fill="y")
+
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self._on_listbox_select)
+        self.listbox.bind("<MouseWheel>", self._on_mousewheel)
+        self.listbox.bind("<Button-4>", lambda event: self._scroll_by(-3)) #X11 wheel up
+        self.listbox.bind("<Button-5>", lambda event: self._scroll_by(3)) #X11 wheel down
+        self.listbox.bind("<Up>", lambda event: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda event: self._move_selection(1))
+
+    def set_manager(self, manager:ActionManager):
+        '''Shows manager's actions, listening to its changes instead of the previous manager's.'''
+        if manager is self.manager:
+            return
+        if self.manager is not None:
+            self.manager.unsubscribe_changes(self._on_change)
+        self.manager = manager
+        manager.subscribe_changes(self._on_change)
+        self.top = 0
+        self.selected = None
+        self._render()
+
+    def selected_index(self) -> int | None:
+        return self.selected
+
+    def clear_selection(self):
+        self.selected = None
+        self.listbox.selection_clear(0, tk.END)
+
+    def _count(self) -> int:
+        return 0 if self.manager is None else len(self.manager.save)
+
+    def _row_text(self, index:int) -> str:
+        store = self.manager.save
+        return f'{store.type_at(index)} - {input_to_str(store.input_at(index))}'
+
+    def _clamp_top(self):
+        self.top = max(0, min(self.top, self._count() - self.rows))
+
+    def _render(self):
+        '''Redraws the visible rows and the scrollbar, converting at most rows + 1 actions to text.'''
+        self._clamp_top()
+        count = self._count()
+        end = min(count, self.top + self.rows + 1) #one extra row fills a partly visible last line
+        self.listbox.delete(0, tk.END)
+        if end > self.top:
+            self.listbox.insert(0, *(self._row_text(index) for index in range(self.top, end)))
+        if self.selected is not None and self.top <= self.selected < end:
+            self.listbox.selection_set(self.selected - self.top)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        count = self._count()
+        if count:
+            self.scrollbar.set(self.top / count, min(1.0, (self.top + self.rows) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _on_change(self, kind:str, index:int | None):
+        '''Keeps the selection on the same action and the view on the same rows, then redraws only if the edit is on screen.'''
+        if kind == "reset":
+            self.top = 0
+            self.selected = None
+            self._render()
+            return
+        if kind == "insert":
+            if self.selected is not None and index <= self.selected:
+                self.selected += 1
+            shift = 1
+        else:
+            if self.selected == index:
+                self.selected = None
+            elif self.selected is not None and index < self.selected:
+                self.selected -= 1
+            shift = -1
+        if index < self.top: #edit above the screen, keep showing the same actions
+            self.top += shift
+            self._clamp_top()
+            self._update_scrollbar()
+        elif index <= self.top + self.rows:
+            self._render()
+        else: #edit below the screen only changes the scrollbar
+            self._update_scrollbar()
+
+    def _on_resize(self, event):
+        font = tkfont.nametofont(self.listbox.cget("font"))
+        row_height = font.metrics("linespace") + 2 * int(self.listbox.cget("selectborderwidth")) + 1
+        rows = max(1, event.height // row_height)
+        if rows != self.rows:
+            self.rows = rows
+            self._render()
+
+    def _on_scroll(self, *args):
+        '''Scrollbar command, args are ("moveto", fraction) or ("scroll", amount, "units" | "pages").'''
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self._count())
+            self._render()
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._scroll_by(amount * self.rows if args[2] == "pages" else amount)
+
+    def _scroll_by(self, amount:int) -> str:
+        self.top += amount
+        self._render()
+        return "break" #the Listbox must not scroll its own few rows
+
+    def _on_mousewheel(self, event) -> str:
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_listbox_select(self, event=None):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + int(selection[0])
+            self.event_generate("<<ActionSelect>>")
+
+    def _move_selection(self, step:int) -> str:
+        count = self._count()
+        if not count:
+            return "break"
+        index = 0 if self.selected is None else max(0, min(count - 1, self.selected + step))
+        self.selected = index
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+        self._render()
+        self.event_generate("<<ActionSelect>>")
+        return "break"
\ No newline at end of file
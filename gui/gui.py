@@ -4,6 +4,9 @@ from macro import *
 from library import *
 from recording import *
 from pynput import keyboard
+from .action_list_view import ActionListView
+from .macro_loader import MacroLoader
+from .playback_monitor import PlaybackMonitor
 import sys
 from pathlib import Path
 
@@ -25,6 +28,9 @@ class GUI:
         self._reset_settings()
 
         self.root = tk.Tk()
+        self.macro_loader = MacroLoader(self.root, self.library, self._on_macro_loaded, self._on_macro_preview) #loads selected saves off the Tk thread
+        self.selected_macro_save = None
+        self.playback_monitor = PlaybackMonitor(self.root, self._on_playback_event, self._on_playback_progress) #replaces polling running
 
         self._setup_root()
         self._setup_saves_widgets()
@@ -52,12 +58,17 @@ class GUI:
         else:
             return
 
+    def _on_close(self):
+        self.library.flush() #saves are written in the background, don't lose the last ones
+        self.root.destroy()
+
     def _setup_root(self):
         root_width = 600
         root_height = 400
         self.root.geometry(f"{root_width}x{root_height}+{(self.root.winfo_screenwidth() - root_width)//2}+{(self.root.winfo_screenheight() - root_height)//2}") #width x height + x_offset + y_offset
         self.root.minsize(width=600, height=400)
         self.root.title("Macro")
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         if getattr(sys, "frozen", False): #fix the pyinstaller issue
             base_path = Path(sys._MEIPASS) / "gui"
@@ -81,6 +92,8 @@ class GUI:
         frame.rowconfigure(0, weight=10)
         frame.rowconfigure(1, weight=1)
         frame.rowconfigure(2, weight=1)
+        frame.rowconfigure(3, weight=1)
+        frame.rowconfigure(4, weight=1)
         frame.columnconfigure(0, weight=1)
         frame.grid(row=0, column=0, columnspan=1, padx=(GUI.OUTER_PADDING, GUI.OUTER_PADDING/2), pady=GUI.OUTER_PADDING, sticky="nsew")
 
@@ -94,15 +107,21 @@ class GUI:
         self.saves_list_sb.config(command=self.saves_list_lb.yview)
         self.saves_list_lb.pack(side="left", fill="both", expand=True)
         self.saves_list_sb.pack(side="right", fill="y")
+
+        self.save_preview = ttk.Label(frame, text="") #action count and duration of the selected save
+        self.save_preview.grid(row=1, column=0, sticky="nsew")
         
         self.load_macro_button = ttk.Button(frame, text="Load Macro", command=self._on_load_macro, takefocus=False)
-        self.load_macro_button.grid(row=1, column=0, pady=(GUI.INNER_PADDING/2, GUI.INNER_PADDING/2), sticky="nsew")
+        self.load_macro_button.grid(row=2, column=0, pady=(GUI.INNER_PADDING/2, GUI.INNER_PADDING/2), sticky="nsew")
         self.load_macro_button.config(state="disabled")
 
         self.delete_macro_button = ttk.Button(frame, text="Delete Macro", command=self._on_delete_macro)
-        self.delete_macro_button.grid(row=2, column=0, pady=(GUI.INNER_PADDING/2, 0), sticky="nsew")
+        self.delete_macro_button.grid(row=3, column=0, pady=(GUI.INNER_PADDING/2, 0), sticky="nsew")
         self.delete_macro_button.config(state="disabled")
 
+        self.convert_saves_button = ttk.Button(frame, text="Convert JSON Saves", command=self._on_convert_saves, takefocus=False)
+        self.convert_saves_button.grid(row=4, column=0, pady=(GUI.INNER_PADDING, 0), sticky="nsew")
+
     def _setup_macro_widgets(self):
         frame = self.macro_frame = ttk.LabelFrame(self.root_frame, text="Macro", padding=GUI.INNER_PADDING)
         frame.rowconfigure(0, weight=3)
@@ -114,25 +133,22 @@ class GUI:
         self.editor_frame.rowconfigure(0, weight=2)
         self.editor_frame.rowconfigure(1, weight=2)
         self.editor_frame.rowconfigure(2, weight=1)
+        self.editor_frame.rowconfigure(3, weight=1)
         self.editor_frame.columnconfigure(0, weight=1)
         self.editor_frame.columnconfigure(1, weight=4)
         self.editor_frame.columnconfigure(2, weight=4)
         self.editor_frame.grid(row=0, column=0, pady=(0, GUI.INNER_PADDING/2), sticky="nsew")
 
-        self.action_list = tk.Frame(self.editor_frame) #frame to hold listbox + scrollbar
+        self.action_list = ActionListView(self.editor_frame) #virtualized listbox + scrollbar
         self.action_list.grid(row=0, column=0, rowspan=2, columnspan=1, padx=(0, GUI.INNER_PADDING/2), pady=(0, GUI.INNER_PADDING/2), sticky="nsew")
-
-        self.action_list_lb = tk.Listbox(self.action_list)
-        self.action_list_sb = tk.Scrollbar(self.action_list)
-        self.action_list_lb.config(yscrollcommand=self.action_list_sb.set)
-        self.action_list_lb.bind("<<ListboxSelect>>", self._on_select_action)
-        self.action_list_sb.config(command=self.action_list_lb.yview)
-        self.action_list_lb.pack(side="left", fill="both", expand=True)
-        self.action_list_sb.pack(side="left", fill="y")
+        self.action_list.bind("<<ActionSelect>>", self._on_select_action)
 
         self.add_action_button = ttk.Button(self.editor_frame, text="Add Action", command=self._on_add_action, takefocus=False)
         self.add_action_button.grid(row=2, column=0, padx=(0, GUI.INNER_PADDING/2), pady=(GUI.INNER_PADDING/2, 0), sticky="nsew")
 
+        self.optimize_button = ttk.Button(self.editor_frame, text="Optimize", command=self._on_optimize, takefocus=False)
+        self.optimize_button.grid(row=3, column=0, padx=(0, GUI.INNER_PADDING/2), pady=(GUI.INNER_PADDING/2, 0), sticky="nsew")
+
         self.current_action_display = tk.Frame(self.editor_frame, bd=1, relief="sunken")
         self.current_action_display.rowconfigure(0, weight=1)
         self.current_action_display.rowconfigure(1, weight=1)
@@ -140,7 +156,7 @@ class GUI:
         self.current_action_display.rowconfigure(3, weight=1)
         self.current_action_display.rowconfigure(4, weight=1)
         self.current_action_display.columnconfigure(0, weight=1)
-        self.current_action_display.grid(row=0, column=1, rowspan=3, columnspan=2, padx=(GUI.INNER_PADDING/2, 0), sticky="nsew")
+        self.current_action_display.grid(row=0, column=1, rowspan=4, columnspan=2, padx=(GUI.INNER_PADDING/2, 0), sticky="nsew")
         self.current_action_display.grid_remove()
         #current action data
         self.current_action_type = ttk.Label(self.current_action_display, text="Type")
@@ -161,6 +177,8 @@ class GUI:
         self.misc_buttons_frame = tk.Frame(frame)
         self.misc_buttons_frame.rowconfigure(0, weight=1)
         self.misc_buttons_frame.rowconfigure(1, weight=1)
+        self.misc_buttons_frame.rowconfigure(2, weight=1)
+        self.misc_buttons_frame.rowconfigure(3, weight=1)
         self.misc_buttons_frame.columnconfigure(0, weight=1)
         self.misc_buttons_frame.columnconfigure(1, weight=1)
         self.misc_buttons_frame.columnconfigure(2, weight=1)
@@ -185,16 +203,39 @@ class GUI:
         self.hotkey_settings_btn = ttk.Button(self.misc_buttons_frame, text="Hotkey Settings", command=self._on_hotkey_settings, takefocus=False)
         self.hotkey_settings_btn.grid(row=1, column=1, sticky="nsew")
 
+        self.playback_frame = tk.Frame(self.misc_buttons_frame) #speed and idle gap settings of the current macro
+        self.playback_frame.grid(row=2, column=0, columnspan=3, sticky="nsew")
+
+        self.speed_label = ttk.Label(self.playback_frame, text="Speed: ")
+        self.speed_label.pack(side="left")
+        self.speed_var = tk.StringVar(self.playback_frame, value="1.0")
+        self.speed_var.trace_add("write", self._on_speed_change)
+        self.speed_spinbox = ttk.Spinbox(self.playback_frame, from_=0.1, to=10.0, increment=0.1, textvariable=self.speed_var, width=5)
+        self.speed_spinbox.pack(side="left")
+
+        self.idle_gap_var = tk.StringVar(self.playback_frame, value="")
+        self.idle_gap_var.trace_add("write", self._on_idle_gap_change)
+        self.idle_gap_entry = ttk.Entry(self.playback_frame, textvariable=self.idle_gap_var, width=6)
+        self.idle_gap_entry.pack(side="right")
+        self.idle_gap_label = ttk.Label(self.playback_frame, text="Max Idle Gap (s): ") #empty entry keeps every gap
+        self.idle_gap_label.pack(side="right")
+
+        self.progress_var = tk.DoubleVar(self.misc_buttons_frame, value=0.0)
+        self.progress_bar = ttk.Progressbar(self.misc_buttons_frame, variable=self.progress_var, maximum=1.0)
+        self.progress_bar.grid(row=3, column=0, columnspan=3, sticky="ew")
+
     def _update_btn_state(self):
         '''Examines and updates states of buttons that are dependent on internal state.'''
         if not self.saves_list_lb.curselection():
             self.load_macro_button.config(state="disabled")
             self.delete_macro_button.config(state="disabled")
         else:
-            self.load_macro_button.config(state="normal")
+            self.load_macro_button.config(state="normal" if self.selected_macro_save is not None else "disabled") #disabled while loading
             self.delete_macro_button.config(state="normal")
 
-        if not self.action_list_lb.curselection():
+        self.convert_saves_button.config(state="normal" if self.library.json_saves() else "disabled")
+
+        if self.action_list.selected_index() is None:
             self.current_action_display.grid_remove()
         else:
             self.action_list.grid()
@@ -213,12 +254,14 @@ class GUI:
         '''Clears the listboxes' selections and sets related attributes to None.'''
         self.saves_list_lb.selection_clear(0, tk.END)
         self.selected_macro_save = None
-        self.action_list_lb.selection_clear(0, tk.END)
+        self.save_preview.config(text="")
+        self.action_list.clear_selection()
         self.selected_action = None
         self.selected_action_data = None
     
     def _populate_save_list(self):
         self.saves_list_lb.delete(0, tk.END)
+        self.save_preview.config(text="") #the selection is gone with the old rows
         for macro in self.library.index.keys():
             self.saves_list_lb.insert(tk.END, macro)
 
@@ -226,7 +269,35 @@ class GUI:
         selection = self.saves_list_lb.curselection()
         if selection:
             save = self.saves_list_lb.get(int(selection[0]))
-            self.selected_macro_save = ActionManager(self.library.retrieve_macro(save))
+            store = self.macro_loader.request(save) #None until loaded, see _on_macro_loaded()
+            if store is not None:
+                self._show_preview(len(store), max(store.timestamps, default=0.0))
+            else:
+                self.save_preview.config(text="Loading...") #nothing here reads the file on the Tk thread, see _on_macro_preview()
+            self.selected_macro_save = ActionManager(store) if store is not None else None
+        self._update_btn_state()
+
+    def _show_preview(self, count:int, duration:float):
+        self.save_preview.config(text=f'{count} actions, {duration:.2f}s')
+
+    def _is_selected(self, name:str) -> bool:
+        selection = self.saves_list_lb.curselection()
+        return bool(selection) and self.saves_list_lb.get(int(selection[0])) == name
+
+    def _on_macro_preview(self, name:str, count:int, duration:float):
+        '''Called on the Tk thread by the MacroLoader with a save's header, before the save itself is loaded.'''
+        if self._is_selected(name) and self.selected_macro_save is None:
+            self._show_preview(count, duration)
+
+    def _on_macro_loaded(self, name:str, store:ActionStore | None):
+        '''Called on the Tk thread by the MacroLoader, ignores loads of saves that are no longer selected.'''
+        if not self._is_selected(name):
+            return
+        if store is None:
+            self.save_preview.config(text="Unreadable save")
+            return
+        self._show_preview(len(store), max(store.timestamps, default=0.0))
+        self.selected_macro_save = ActionManager(store)
         self._update_btn_state()
 
     def _open_confirm_toplevel(self) -> bool:
@@ -282,22 +353,45 @@ class GUI:
             except:
                 return
             
+    def _on_convert_saves(self):
+        '''Converts the library's JSON saves to the binary format, keeping each original as a .bak file.'''
+        if not self._open_confirm_toplevel():
+            return
+        converted = self.library.migrate_json_saves()
+        self._clear_lb_selections()
+        self._refresh_ui()
+        self.save_preview.config(text=f'Converted {converted} saves')
+
     def _populate_action_list(self):
-        self.action_list_lb.delete(0, tk.END)
-        for action in self.current_macro.save:
-            action_data = action.to_dict()
-            action_desc = f'{action_data["type"]} - {action_data["input"]}'
-            self.action_list_lb.insert(tk.END, action_desc)
+        self.action_list.set_manager(self.current_macro) #only redraws when the macro was swapped, edits update the list through change notifications
 
     def _on_select_action(self, event=None):
-        selection = self.action_list_lb.curselection()
-        if selection:
+        index = self.action_list.selected_index()
+        if index is not None:
             self.current_action_display.grid()
-            action = self.current_macro.save[int(selection[0])]
+            action = self.current_macro.save[index]
             self.selected_action = action
             self.selected_action_data = self.selected_action.to_dict()  
             self._populate_action_display() 
 
+    def _populate_playback_settings(self):
+        self.speed_var.set(str(self.current_macro.speed))
+        max_idle_gap = self.current_macro.max_idle_gap
+        self.idle_gap_var.set("" if max_idle_gap is None else str(max_idle_gap))
+
+    def _on_speed_change(self, *args):
+        try:
+            self.current_macro.speed = float(self.speed_var.get())
+        except ValueError: #ignore partial or invalid input until it is fixed
+            return
+
+    def _on_idle_gap_change(self, *args):
+        value = self.idle_gap_var.get().strip()
+        try:
+            self.current_macro.max_idle_gap = float(value) if value else None
+        except ValueError:
+            return
+
     def _populate_action_display(self):
         if not hasattr(self, "selected_action") or self.selected_action is None:
             return
@@ -420,8 +514,8 @@ class GUI:
             print("Invalid action.")
             return
         try:
-            self.current_macro.add_action(action)
-            self._refresh_ui()
+            self.current_macro.add_action(action) #the action list updates itself
+            self._update_btn_state()
         except AttributeError: #attribute error because current_macro.add_action accesses Action's timestamp
             return
     
@@ -431,8 +525,18 @@ class GUI:
         self.current_macro.remove_action(self.selected_action)
         self.selected_action = None
         self.selected_action_data = None
-        self._refresh_ui()
+        self._update_btn_state()
     
+    def _on_optimize(self):
+        if self.current_macro.running:
+            return
+        removed = sum(self.current_macro.optimize().values()) #the action list resets itself if anything changed
+        self.selected_action = None
+        self.selected_action_data = None
+        self._update_btn_state()
+        self.optimize_button.config(text=f"Saved {removed} events")
+        self.root.after(1500, lambda: self.optimize_button.config(text="Optimize"))
+
     def _on_start(self):
         if hasattr(self, "current_macro") and self.current_macro is not None:
             self.start_button.config(state="disabled")
@@ -443,15 +547,16 @@ class GUI:
             else:
                 self.current_macro.looping = False
 
+            self.playback_monitor.attach(self.current_macro)
             self.current_macro.start()
-            self.root.after(100, self._check_macro_state)
 
-    def _check_macro_state(self): #helper to _on_start()
-        '''Checks if the macro is currently running. If it is, poll again. If not, resets button state.'''
-        if not self.current_macro.running:
+    def _on_playback_event(self, event:PlaybackEvent): #helper to _on_start()
+        '''Called on the Tk thread by the PlaybackMonitor, resets button state once playback stops.'''
+        if event.kind == "stopped":
             self._update_btn_state()
-        else:
-            self.root.after(100, self._check_macro_state)
+
+    def _on_playback_progress(self, share:float):
+        self.progress_var.set(share)
     
     def _on_stop(self):
         if hasattr(self, "current_macro") and self.current_macro is not None:
@@ -542,7 +647,7 @@ class GUI:
     def _on_record(self):
         recorded_macro = ActionManager()
 
-        top_width, top_height = 200, 100
+        top_width, top_height = 200, 125
         pos_x, pos_y = (self.root.winfo_x() + (self.root.winfo_width() - top_width)//2), (self.root.winfo_y() + (self.root.winfo_height() - top_height)//2)
 
         record_window = tk.Toplevel(self.root)
@@ -554,6 +659,7 @@ class GUI:
 
         record_window.rowconfigure(0, weight=1)
         record_window.rowconfigure(1, weight=1)
+        record_window.rowconfigure(2, weight=1)
         record_window.columnconfigure(0, weight=1)
         record_window.columnconfigure(1, weight=1)
 
@@ -570,6 +676,9 @@ class GUI:
             self.recorder.stop_record()
             recorded_macro = ActionManager(self.recorder.retrieve_record())
 
+        def toggle_moves():
+            self.recorder.record_moves = record_moves_var.get()
+
         def confirm():
             record_window.destroy()
 
@@ -580,8 +689,12 @@ class GUI:
         stop_record_btn.config(state="disabled")
         stop_record_btn.grid(row=0, column=1, sticky="nsew")
 
+        record_moves_var = tk.BooleanVar(record_window, value=self.recorder.record_moves)
+        record_moves_check_btn = ttk.Checkbutton(record_window, text="Record Mouse Movement", variable=record_moves_var, command=toggle_moves)
+        record_moves_check_btn.grid(row=1, column=0, columnspan=2)
+
         confirm_btn = ttk.Button(record_window, text="Confirm", command=confirm, takefocus=False)
-        confirm_btn.grid(row=1, column=0, columnspan=2, sticky="nsew")
+        confirm_btn.grid(row=2, column=0, columnspan=2, sticky="nsew")
 
         self.root.wait_window(record_window)
 
@@ -645,4 +758,5 @@ class GUI:
         self._populate_save_list()
         self._populate_action_list()
         self._populate_action_display()
+        self._populate_playback_settings()
         self._update_btn_state()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import queue
+import threading
+from typing import Callable
+from macro import ActionStore
+from library import MacroLibrary
+
+class MacroLoader:
+    '''Class that retrieves saved macros on a worker thread and hands them back to the Tk thread, preceded by a preview read from the save's header. Macros in the library's cache are returned right away.'''
+
+    POLL_INTERVAL = 50 #ms between checks for finished loads, only while a load is pending
+
+    def __init__(self, root, library:MacroLibrary, on_loaded:Callable[[str, ActionStore | None], None], on_preview:Callable[[str, int, float], None] | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param root: Tk widget whose after() runs on_loaded on the Tk thread.
+        :param library: library to retrieve macros from.
+        :type library: MacroLibrary
+        :param on_loaded: called on the Tk thread with the name and the loaded store, or None if loading failed.
+        :type on_loaded: Callable[[str, ActionStore | None], None]
+        :param on_preview: called on the Tk thread with the name, action count and duration of a save before it is fully loaded. None skips previews.
+        :type on_preview: Callable[[str, int, float], None] | None
+        '''
+        self.root = root
+        self.library = library
+        self.on_loaded = on_loaded
+        self.on_preview = on_preview
+        self._requests = queue.Queue() #names for the worker
+        self._results = queue.Queue() #(name, (count, duration) | None, ActionStore | None) for the Tk thread, a preview if the second item is set
+        self._pending = 0 #requests not yet handed back
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def request(self, name:str) -> ActionStore | None:
+        '''Returns the macro if the library has it cached. Otherwise starts loading it in the background for on_loaded and returns None.'''
+        store = self.library.cached_macro(name)
+        if store is not None:
+            return store
+        self._requests.put(name)
+        self._pending += 1
+        if self._pending == 1:
+            self.root.after(MacroLoader.POLL_INTERVAL, self._poll)
+        return None
+
+    def _work(self):
+        '''Worker thread: loads requested macros, skipping requests superseded by newer ones while it was busy.'''
+        while True:
+            name = self._requests.get()
+            skipped = 0
+            while not self._requests.empty(): #only the latest selection matters
+                name = self._requests.get()
+                skipped += 1
+            for _ in range(skipped):
+                self._results.put((None, None, None))
+            if self.on_preview is not None:
+                try:
+                    self._results.put((name, self.library.preview_macro(name), None)) #binary saves are only mapped, so this arrives long before the store
+                except MacroLibrary.LOAD_ERRORS:
+                    pass
+            try:
+                store = self.library.retrieve_macro(name)
+            except MacroLibrary.LOAD_ERRORS: #a damaged save must not end the worker
+                store = None
+            self._results.put((name, None, store))
+
+    def _poll(self):
+        while True:
+            try:
+                name, preview, store = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if preview is not None:
+                self.on_preview(name, *preview)
+                continue
+            self._pending -= 1
+            if name is None: #superseded request
+                continue
+            self.on_loaded(name, store)
+        if self._pending:
+            self.root.after(MacroLoader.POLL_INTERVAL, self._poll)
\ No newline at end of file
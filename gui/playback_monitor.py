@@ -0,0 +1,78 @@
+import queue
+import threading
+from typing import Callable
+from macro import ActionManager, PlaybackEvent
+
+class PlaybackMonitor:
+    '''Class bridging an ActionManager's playback events to the Tk thread. The playback thread only queues lifecycle events in order and keeps the latest "action" event. The Tk thread picks them up with after() polling every UPDATE_INTERVAL, but only from a "started" event until the "stopped" event, so nothing runs while no macro plays.'''
+
+    UPDATE_INTERVAL = 50 #ms between Tk updates while a playback runs
+
+    def __init__(self, root, on_event:Callable[[PlaybackEvent], None], on_progress:Callable[[float], None]):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param root: Tk widget whose after() runs the callbacks on the Tk thread.
+        :param on_event: called on the Tk thread with every event except "action".
+        :type on_event: Callable[[PlaybackEvent], None]
+        :param on_progress: called on the Tk thread with the share of the current iteration played, from 0.0 to 1.0.
+        :type on_progress: Callable[[float], None]
+        '''
+        self.root = root
+        self.on_event = on_event
+        self.on_progress = on_progress
+        self.manager = None
+        self.duration = 0.0 #plan duration from the latest "started" event
+        self._events = queue.Queue() #lifecycle events from the playback thread
+        self._latest = None #newest "action" event, replaced rather than queued
+        self._lock = threading.Lock() #guards _polling against the queue check that ends polling
+        self._polling = False #a _poll() is scheduled on the Tk thread
+
+    def attach(self, manager:ActionManager):
+        '''Listens to manager instead of the previously attached one.'''
+        if manager is self.manager:
+            return
+        if self.manager is not None:
+            self.manager.unsubscribe(self._on_playback_event)
+        self.manager = manager
+        manager.subscribe(self._on_playback_event)
+
+    def _on_playback_event(self, event:PlaybackEvent):
+        '''Runs on the playback thread, only stores the event for the next poll. A "started" event starts polling if it isn't running.'''
+        if event.kind == "action":
+            self._latest = event
+            return
+        with self._lock:
+            self._events.put(event)
+            if self._polling:
+                return
+            self._polling = True
+        #the one Tk call made off the Tk thread, once per playback. tkinter built on a threaded Tcl, as every current CPython build is, hands it to the thread running mainloop()
+        self.root.after(0, self._poll)
+
+    def _poll(self):
+        '''Runs on the Tk thread: hands over queued events and the latest progress, then schedules the next poll unless playback stopped.'''
+        playing = True
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if event.kind == "started":
+                self.duration = event.offset or 0.0
+                self._latest = None
+                playing = True
+            self.on_event(event)
+            if event.kind == "stopped":
+                playing = False
+                self._latest = None
+                self.on_progress(0.0)
+        latest, self._latest = self._latest, None
+        if latest is not None and self.duration > 0:
+            self.on_progress(min(1.0, latest.offset / self.duration))
+        with self._lock:
+            if not playing and self._events.empty(): #a later "started" queues under the lock and schedules a new poll
+                self._polling = False
+                return
+        self.root.after(PlaybackMonitor.UPDATE_INTERVAL, self._poll)
\ No newline at end of file
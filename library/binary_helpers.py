@@ -0,0 +1,179 @@
+import math
+import mmap
+import struct
+import sys
+from array import array
+from library.persistence import atomic_write
+from macro import Action, ActionStore, key_to_str, str_to_key, button_to_str, str_to_button
+
+#Binary macro file layout, all little-endian:
+#header: magic, format version, header size, record count, input table entry count, input table size in bytes
+#playback settings (version 2+): speed (f64), max idle gap (f64, NaN for None)
+#input table: per entry a kind byte (0 key, 1 mouse button), a u16 length (NONE_LENGTH for None), then utf-8 text, padded to 8 bytes
+#record table: fixed-width columns of timestamps (f64), x (i32), y (i32), input ids (u32), type codes (u8)
+
+EXTENSION = ".macro"
+MAGIC = b"MACR"
+VERSION = 2
+HEADER = struct.Struct("<4sHHQII")
+SETTINGS = struct.Struct("<dd")
+ENTRY = struct.Struct("<BH")
+NONE_LENGTH = 0xFFFF
+KEY, BUTTON = 0, 1
+CHUNK_SIZE = 4096 #records converted at a time by iter_binary_actions()
+COLUMNS = (("timestamps", "d"), ("xs", "i"), ("ys", "i"), ("inputs", "I"), ("types", "B")) #widest first so every column stays aligned
+
+def _check_extension(file_path:str):
+    if not file_path.endswith(EXTENSION):
+        raise ValueError(f'Input file must be a {EXTENSION} file.')
+
+def _input_kinds(store:ActionStore) -> list[int]:
+    '''Returns KEY or BUTTON for each of the store's interned inputs, BUTTON if any mouse action references it.'''
+    kinds = [KEY] * len(store.input_table)
+    for type_code, input_id in zip(store.types, store.inputs):
+        if ActionStore.TYPES[type_code] in ActionStore.MOUSE_TYPES:
+            kinds[input_id] = BUTTON
+    return kinds
+
+def _encode_input_table(store:ActionStore) -> bytes:
+    '''Encodes the store's interned inputs, see _input_kinds() for how key or button is picked.'''
+    parts = []
+    for kind, input in zip(_input_kinds(store), store.input_table):
+        text = button_to_str(input) if kind == BUTTON else key_to_str(input)
+        if text is None:
+            parts.append(ENTRY.pack(kind, NONE_LENGTH))
+        else:
+            encoded = text.encode("utf-8")
+            parts.append(ENTRY.pack(kind, len(encoded)) + encoded)
+    table = b"".join(parts)
+    return table + bytes(-len(table) % 8)
+
+def _decode_input_table(buffer, offset:int, count:int) -> list:
+    table = []
+    for _ in range(count):
+        kind, length = ENTRY.unpack_from(buffer, offset)
+        offset += ENTRY.size
+        if length == NONE_LENGTH:
+            table.append(None)
+            continue
+        text = bytes(buffer[offset:offset + length]).decode("utf-8")
+        offset += length
+        table.append(str_to_button(text) if kind == BUTTON else str_to_key(text))
+    return table
+
+def _encode_settings(settings:dict) -> bytes:
+    max_idle_gap = settings.get("max_idle_gap")
+    return SETTINGS.pack(settings.get("speed", 1.0), math.nan if max_idle_gap is None else max_idle_gap)
+
+def _decode_settings(buffer, version:int, header_size:int) -> dict:
+    if version < 2 or header_size < HEADER.size + SETTINGS.size: #version 1 files have no settings
+        return {}
+    speed, max_idle_gap = SETTINGS.unpack_from(buffer, HEADER.size)
+    return {"speed": speed, "max_idle_gap": None if math.isnan(max_idle_gap) else max_idle_gap}
+
+def encode_binary(store:ActionStore) -> bytes:
+    '''Function returns the contents of a binary macro file holding an input ActionStore.'''
+    table = _encode_input_table(store)
+    parts = [HEADER.pack(MAGIC, VERSION, HEADER.size + SETTINGS.size, len(store), len(store.input_table), len(table)), _encode_settings(store.settings), table]
+    for name, typecode in COLUMNS:
+        column = getattr(store, name)
+        if sys.byteorder != "little":
+            column = array(typecode, column)
+            column.byteswap()
+        parts.append(column.tobytes())
+    return b"".join(parts)
+
+def save_as_binary(store:ActionStore, file_path:str):
+    '''Function takes an input ActionStore and saves it in an input binary macro file, replacing the file atomically.'''
+    _check_extension(file_path)
+    atomic_write(file_path, encode_binary(store))
+
+def read_header(file_path:str) -> tuple[int, int]:
+    '''Function reads only the header of a binary macro file and returns (format version, record count). Raises ValueError if it is not one.'''
+    _check_extension(file_path)
+    with open(file_path, 'rb') as file:
+        header = file.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError("File is not a binary macro")
+    magic, version, header_size, count, input_count, table_size = HEADER.unpack(header)
+    if magic != MAGIC or version > VERSION:
+        raise ValueError("File is not a supported binary macro")
+    return version, count
+
+class MappedMacro:
+    '''Class giving read only, zero-copy access to a binary macro file through mmap. Use as a context manager or call close().'''
+
+    def __init__(self, file_path:str):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param file_path: path of the binary macro file to map.
+        :type file_path: str
+        '''
+        _check_extension(file_path)
+        with open(file_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            magic, version, header_size, count, input_count, table_size = HEADER.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version > VERSION:
+                raise ValueError("File is not a supported binary macro")
+            self.version = version
+            self.count = count
+            self.settings = _decode_settings(self._mmap, version, header_size)
+            self.input_table = _decode_input_table(self._mmap, header_size, input_count)
+            offset = header_size + table_size
+            for name, typecode in COLUMNS:
+                size = struct.calcsize(typecode) * count
+                if offset + size > len(self._mmap):
+                    raise ValueError("Binary macro is truncated")
+                view = memoryview(self._mmap)[offset:offset + size].cast(typecode) #little-endian only, see COLUMNS
+                self._views.append(view)
+                setattr(self, name, view)
+                offset += size
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError("File does not contain a valid binary macro")
+
+    def to_store(self) -> ActionStore:
+        '''Copies the mapped columns into a new ActionStore.'''
+        store = ActionStore()
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            column.frombytes(getattr(self, name).cast("B"))
+            if sys.byteorder != "little":
+                column.byteswap()
+            setattr(store, name, column)
+        store.input_table = list(self.input_table)
+        store._input_ids = {input: input_id for input_id, input in enumerate(store.input_table)}
+        store.settings = dict(self.settings)
+        return store
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def retrieve_from_binary(file_path:str) -> ActionStore:
+    '''Function takes an input binary macro file path and returns its contents as an ActionStore.'''
+    with MappedMacro(file_path) as mapped:
+        return mapped.to_store()
+
+def iter_binary_actions(file_path:str, chunk_size:int = CHUNK_SIZE):
+    '''Generator that yields the Actions of an input binary macro file, converting chunk_size records at a time straight from the mapped file.'''
+    with MappedMacro(file_path) as mapped:
+        table = mapped.input_table
+        for begin in range(0, mapped.count, chunk_size):
+            end = min(begin + chunk_size, mapped.count)
+            rows = zip(mapped.types[begin:end].tolist(), mapped.inputs[begin:end].tolist(), mapped.timestamps[begin:end].tolist(), mapped.xs[begin:end].tolist(), mapped.ys[begin:end].tolist())
+            for type_code, input_id, timestamp, x, y in rows:
+                location = None if x == ActionStore.NO_LOCATION else (x, y)
+                yield Action(type=ActionStore.TYPES[type_code], input=table[input_id], timestamp=timestamp, location=location)
\ No newline at end of file
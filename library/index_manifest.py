@@ -0,0 +1,79 @@
+import os
+from library.json_helpers import save_as_json, retrieve_from_json, encode_json
+from library.persistence import PersistenceWorker
+
+class IndexManifest:
+    '''Class persisting what is known about each file in the save folder, so startup only re-validates files that are new or changed.'''
+
+    VERSION = 1 #bump when the entry format changes, older manifests are then discarded
+    FILE_NAME = "index.json"
+
+    def __init__(self, folder_path:str, writer:PersistenceWorker | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param folder_path: folder the manifest file is kept in.
+        :type folder_path: str
+        :param writer: worker save() queues the manifest file on, so repeated saves coalesce into one write. None writes synchronously.
+        :type writer: PersistenceWorker | None
+        '''
+        self.file_path = os.path.join(folder_path, IndexManifest.FILE_NAME)
+        self.writer = writer
+        self.entries = {} #dict mapping file names to {"name", "path", "size", "mtime", "format_version", "valid"}
+        self._dirty = False #True if entries changed since the last save
+        self.load()
+
+    def load(self):
+        '''Reads the manifest file, starting empty if it is missing, unreadable or from another version.'''
+        if self.writer is not None:
+            self.writer.flush(self.file_path)
+        try:
+            data = retrieve_from_json(file_path=self.file_path)
+        except (ValueError, OSError):
+            return
+        if not isinstance(data, dict) or data.get("version") != IndexManifest.VERSION or not isinstance(data.get("entries"), dict):
+            return
+        self.entries = data["entries"]
+
+    def save(self):
+        '''Writes the manifest file if anything changed since it was loaded or last saved.'''
+        if not self._dirty:
+            return
+        data = {"version": IndexManifest.VERSION, "entries": self.entries}
+        if self.writer is None:
+            save_as_json(data, self.file_path)
+        else:
+            self.writer.submit(self.file_path, encode_json(data)) #encoded now, entries keep changing on this thread
+        self._dirty = False
+
+    def lookup(self, file:str, stat:os.stat_result) -> dict | None:
+        '''Returns the entry for file if its size and mtime still match stat, otherwise None.'''
+        entry = self.entries.get(file)
+        if entry is None or entry.get("size") != stat.st_size or entry.get("mtime") != stat.st_mtime_ns:
+            return None
+        return entry
+
+    def update(self, file:str, name:str, path:str, stat:os.stat_result, format_version:int | None) -> dict:
+        '''Records the result of validating file and returns the new entry. A format_version of None marks the file invalid.'''
+        entry = {
+            "name": name,
+            "path": path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "format_version": format_version,
+            "valid": format_version is not None
+        }
+        self.entries[file] = entry
+        self._dirty = True
+        return entry
+
+    def remove(self, file:str):
+        if self.entries.pop(file, None) is not None:
+            self._dirty = True
+
+    def prune(self, files:set[str]):
+        '''Drops entries for files that are no longer in the save folder.'''
+        for file in list(self.entries.keys()):
+            if file not in files:
+                self.remove(file)
\ No newline at end of file
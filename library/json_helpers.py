@@ -1,13 +1,20 @@
 import json
+import re
+from library.persistence import atomic_write
 
 INDENT = 4
+PEEK_SIZE = 256 #bytes read by peek_json_key()
+CHUNK_SIZE = 1 << 16 #characters read at a time by iter_json_array()
+
+def encode_json(data:dict) -> bytes:
+    '''Function returns the contents save_as_json() writes for an input dict, for writing elsewhere, e.g. through a PersistenceWorker.'''
+    return json.dumps(data, indent=INDENT).encode("utf-8")
 
 def save_as_json(data:dict, file_path:str):
-    '''Function takes an input dict and saves it in an input json file.'''
+    '''Function takes an input dict and saves it in an input json file, replacing the file atomically.'''
     if not file_path.endswith(".json"):
         raise ValueError("Input file must be a JSON file.")
-    with open(file_path, 'w') as file:
-        json.dump(data, file, indent=INDENT)
+    atomic_write(file_path, encode_json(data))
 
 def retrieve_from_json(file_path:str):
     '''Function takes an input json file path and returns its contents.'''
@@ -18,4 +25,48 @@ def retrieve_from_json(file_path:str):
             data = json.load((file))
             return data
     except json.JSONDecodeError:
-        raise ValueError("File does not contain valid JSON")
\ No newline at end of file
+        raise ValueError("File does not contain valid JSON")
+
+def peek_json_key(file_path:str, key:str, value:str) -> bool:
+    '''Function reads only the start of an input json file and returns True if its first key is key with the string value. False is inconclusive, not invalid.'''
+    if not file_path.endswith(".json"):
+        raise ValueError("Input file must be a JSON file.")
+    with open(file_path, 'rb') as file:
+        head = file.read(PEEK_SIZE)
+    pattern = rb'\s*\{\s*' + re.escape(json.dumps(key).encode()) + rb'\s*:\s*' + re.escape(json.dumps(value).encode())
+    return re.match(pattern, head) is not None
+
+def iter_json_array(file_path:str, key:str, chunk_size:int = CHUNK_SIZE):
+    '''Generator that yields the objects in the array stored under key in an input json file, decoding chunk by chunk instead of loading the whole file.'''
+    if not file_path.endswith(".json"):
+        raise ValueError("Input file must be a JSON file.")
+    decoder = json.JSONDecoder()
+    opening = re.compile(re.escape(json.dumps(key)) + r'\s*:\s*\[')
+    whitespace = " \t\n\r,"
+    with open(file_path, 'r') as file:
+        buffer = ""
+        match = None
+        while match is None:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'File does not contain the key: {key}')
+            buffer += chunk
+            match = opening.search(buffer)
+        position = match.end()
+        while True:
+            while position < len(buffer) and buffer[position] in whitespace:
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                if position == len(buffer):
+                    raise json.JSONDecodeError("Incomplete chunk", buffer, position)
+                value, position = decoder.raw_decode(buffer, position) #objects can't decode early from a partial chunk, unlike numbers
+            except json.JSONDecodeError:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise ValueError("File does not contain valid JSON")
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield value
\ No newline at end of file
@@ -0,0 +1,201 @@
+import gzip
+import itertools
+import lzma
+import math
+import operator
+import os
+import struct
+import sys
+from array import array
+from typing import Iterable, Iterator
+from macro import ActionStore, key_to_str, str_to_key, button_to_str, str_to_button
+from library.persistence import TEMP_SUFFIX
+from library.binary_helpers import SETTINGS, ENTRY, NONE_LENGTH, BUTTON, _input_kinds, _encode_settings
+
+#Macro archive layout, all little-endian:
+#header (uncompressed): magic, format version, compression method
+#then one compressed stream of entries, ended by an entry header with a name length of 0
+#entry: header, utf-8 name, playback settings (speed f64, max idle gap f64, NaN for None), new dictionary entries, input table, body
+#dictionary entries are encoded like binary macro input table entries (kind byte, u16 length, utf-8 text) without padding, and are shared by all later entries
+#input table: per input of the entry its id in the archive dictionary (u32)
+#body: type codes (u8, LOCATED bit set if the action has a location), input ids (u32), timestamp deltas in microseconds (i64), then x and y deltas of located actions only (i64)
+#columns wider than a byte are stored byte-planar, all first bytes then all second bytes and so on, so the mostly zero high bytes of small deltas compress well
+
+EXTENSION = ".macroarchive"
+MAGIC = b"MACA"
+VERSION = 1
+HEADER = struct.Struct("<4sHB")
+ENTRY_HEADER = struct.Struct("<HIIQQ") #name length, new dictionary entries, input table length, action count, body size
+METHODS = {"zlib": 0, "lzma": 1} #zlib streams use the gzip container so they can be read incrementally
+DEFAULT_METHOD = "lzma"
+PRESETS = {"zlib": 6, "lzma": 6} #higher levels cost several times the time for a few percent
+TICKS_PER_SECOND = 1_000_000 #timestamps are stored as whole microseconds, dividing by the exact integer round-trips them to the nearest float
+LOCATED = 0x80 #type code bit marking actions with a location
+UNLOCATE = bytes(code & ~LOCATED for code in range(256)) #bytes.translate() table clearing LOCATED
+
+def _check_extension(file_path:str):
+    if not file_path.endswith(EXTENSION):
+        raise ValueError(f'Archive file must be a {EXTENSION} file.')
+
+def _pack(typecode:str, values) -> bytes:
+    column = array(typecode, values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    data = column.tobytes()
+    return b"".join(data[plane::column.itemsize] for plane in range(column.itemsize))
+
+def _read_exact(stream, size:int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Macro archive is truncated")
+    return data
+
+def _unpack(stream, typecode:str, count:int) -> array:
+    column = array(typecode)
+    planar = _read_exact(stream, column.itemsize * count)
+    data = bytearray(len(planar))
+    for plane in range(column.itemsize):
+        data[plane::column.itemsize] = planar[plane * count:(plane + 1) * count]
+    column.frombytes(data)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+def _deltas(values:list[int]) -> list[int]:
+    return list(map(operator.sub, values, [0] + values[:-1]))
+
+def _encode_entry(name:str, store:ActionStore, dictionary:dict) -> bytes:
+    '''Encodes one macro, adding its inputs that aren't in dictionary yet (mapping (kind, text) to archive id) to both the entry and dictionary.'''
+    new_entries = []
+    table = []
+    for kind, input in zip(_input_kinds(store), store.input_table):
+        text = button_to_str(input) if kind == BUTTON else key_to_str(input)
+        archive_id = dictionary.get((kind, text))
+        if archive_id is None:
+            archive_id = dictionary[(kind, text)] = len(dictionary)
+            encoded = b"" if text is None else text.encode("utf-8")
+            new_entries.append(ENTRY.pack(kind, NONE_LENGTH if text is None else len(encoded)) + encoded)
+        table.append(archive_id)
+
+    no_location = ActionStore.NO_LOCATION
+    located = [index for index, x in enumerate(store.xs) if x != no_location]
+    ticks = [round(timestamp * TICKS_PER_SECOND) for timestamp in store.timestamps]
+    body = b"".join((
+        bytes(code if x == no_location else code | LOCATED for code, x in zip(store.types, store.xs)),
+        _pack("I", store.inputs),
+        _pack("q", _deltas(ticks)),
+        _pack("q", _deltas([store.xs[index] for index in located])),
+        _pack("q", _deltas([store.ys[index] for index in located])),
+    ))
+    encoded_name = name.encode("utf-8")
+    return b"".join((
+        ENTRY_HEADER.pack(len(encoded_name), len(new_entries), len(table), len(store), len(body)),
+        encoded_name,
+        _encode_settings(store.settings),
+        *new_entries,
+        _pack("I", table),
+        body,
+    ))
+
+def _decode_body(stream, count:int, input_table:list, settings:dict) -> ActionStore:
+    codes = _read_exact(stream, count)
+    inputs = _unpack(stream, "I", count)
+    ticks = itertools.accumulate(_unpack(stream, "q", count))
+    located = [index for index, code in enumerate(codes) if code & LOCATED]
+    xs = itertools.accumulate(_unpack(stream, "q", len(located)))
+    ys = itertools.accumulate(_unpack(stream, "q", len(located)))
+
+    store = ActionStore()
+    store.types = array("B", codes.translate(UNLOCATE))
+    store.inputs = inputs
+    store.timestamps = array("d", [tick / TICKS_PER_SECOND for tick in ticks])
+    store.xs = array("i", [ActionStore.NO_LOCATION]) * count
+    store.ys = array("i", [ActionStore.NO_LOCATION]) * count
+    for index, x, y in zip(located, xs, ys):
+        store.xs[index] = x
+        store.ys[index] = y
+    store.input_table = input_table
+    store._input_ids = {input: input_id for input_id, input in enumerate(input_table)}
+    store.settings = settings
+    return store
+
+def _open(file_path:str, mode:str, method:str | None = None):
+    '''Opens the archive's compressed stream after reading or writing its header.'''
+    file = open(file_path, mode)
+    try:
+        if mode == 'wb':
+            file.write(HEADER.pack(MAGIC, VERSION, METHODS[method]))
+            code = METHODS[method]
+        else:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError("File is not a macro archive")
+            magic, version, code = HEADER.unpack(header)
+            if magic != MAGIC or version > VERSION or code not in METHODS.values():
+                raise ValueError("File is not a supported macro archive")
+        mode = mode[0]
+        if code == METHODS["lzma"]:
+            return file, lzma.LZMAFile(file, mode, preset=PRESETS["lzma"] if mode == 'w' else None)
+        return file, gzip.GzipFile(fileobj=file, mode=mode, compresslevel=PRESETS["zlib"])
+    except BaseException:
+        file.close()
+        raise
+
+def write_archive(file_path:str, macros:Iterable[tuple[str, ActionStore]], method:str = DEFAULT_METHOD) -> int:
+    '''Function writes (name, store) pairs to an archive file, one at a time so only one macro is encoded in memory. The archive is streamed to a temporary file that only replaces file_path once complete, so a failure never leaves a partial archive behind. Returns how many were written.'''
+    _check_extension(file_path)
+    if method not in METHODS:
+        raise ValueError(f'Invalid compression method: {method}')
+    temp_path = f'{file_path}{TEMP_SUFFIX}'
+    file, stream = _open(temp_path, 'wb', method)
+    written = 0
+    dictionary = {}
+    try:
+        with file, stream:
+            for name, store in macros:
+                stream.write(_encode_entry(name, store, dictionary))
+                written += 1
+            stream.write(ENTRY_HEADER.pack(0, 0, 0, 0, 0))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return written
+
+def iter_archive(file_path:str, names:Iterable[str] | None = None) -> Iterator[tuple[str, ActionStore | None]]:
+    '''Generator that yields (name, store) for each macro in an archive file while decompressing it. Macros not in names (all are decoded by default) are yielded with None instead of a store, without decoding their actions. Raises ValueError if the file isn't a valid archive.'''
+    _check_extension(file_path)
+    names = None if names is None else set(names)
+    file, stream = _open(file_path, 'rb')
+    dictionary = [] #decoded inputs by archive id
+    with file, stream:
+        try:
+            while True:
+                name_length, new_count, table_length, count, body_size = ENTRY_HEADER.unpack(_read_exact(stream, ENTRY_HEADER.size))
+                if name_length == 0:
+                    return
+                name = _read_exact(stream, name_length).decode("utf-8")
+                speed, max_idle_gap = SETTINGS.unpack(_read_exact(stream, SETTINGS.size))
+                for _ in range(new_count):
+                    kind, length = ENTRY.unpack(_read_exact(stream, ENTRY.size))
+                    if length == NONE_LENGTH:
+                        dictionary.append(None)
+                        continue
+                    text = _read_exact(stream, length).decode("utf-8")
+                    dictionary.append(str_to_button(text) if kind == BUTTON else str_to_key(text))
+                table = [dictionary[archive_id] for archive_id in _unpack(stream, "I", table_length)]
+                if names is not None and name not in names:
+                    stream.seek(body_size, 1) #still decompressed, but never decoded
+                    yield name, None
+                    continue
+                settings = {"speed": speed, "max_idle_gap": None if math.isnan(max_idle_gap) else max_idle_gap}
+                yield name, _decode_body(stream, count, table, settings)
+        except (OSError, EOFError, lzma.LZMAError, struct.error, UnicodeDecodeError, IndexError):
+            raise ValueError("File does not contain a valid macro archive")
+
+def read_archive_names(file_path:str) -> list[str]:
+    '''Function returns the names of the macros in an archive file, in archive order, without decoding any actions.'''
+    return [name for name, store in iter_archive(file_path, names=())]
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import OrderedDict
+from macro import ActionStore
+
+class MacroCache:
+    '''Class holding recently parsed macros, evicting the least recently used ones once their estimated memory exceeds max_bytes. Entries are only valid while their file keeps the size and mtime it had when parsed.'''
+
+    ENTRY_OVERHEAD = 512 #estimated bytes per entry on top of ActionStore.nbytes(): the store object, its settings and input table
+
+    def __init__(self, max_bytes:int):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param max_bytes: memory budget in bytes, 0 disables caching. A macro larger than the budget is never cached.
+        :type max_bytes: int
+        '''
+        if max_bytes < 0:
+            raise ValueError("Invalid cache size: negative.")
+        self.max_bytes = max_bytes
+        self.nbytes = 0 #estimated memory of all entries
+        self._entries = OrderedDict() #name -> (store, nbytes, file size, file mtime in ns), most recently used last
+        self._lock = threading.Lock() #the library may be used from a loader thread and the Tk thread at once
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(store:ActionStore) -> int:
+        return store.nbytes() + MacroCache.ENTRY_OVERHEAD
+
+    def get(self, name:str, stat:os.stat_result) -> ActionStore | None:
+        '''Returns a copy of the cached macro if its file is unchanged, otherwise None. Counts a hit or a miss.'''
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and (entry[2], entry[3]) != (stat.st_size, stat.st_mtime_ns): #file changed behind the library's back
+                self._drop(name)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, name:str, stat:os.stat_result, store:ActionStore):
+        '''Caches store for name, which must not be modified afterwards, evicting old entries to stay within max_bytes.'''
+        size = MacroCache._size(store)
+        with self._lock:
+            self._drop(name)
+            if size > self.max_bytes:
+                return
+            self._entries[name] = (store, size, stat.st_size, stat.st_mtime_ns)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, name:str | None = None):
+        '''Drops name from the cache, or every macro if name is None.'''
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+                self.nbytes = 0
+            else:
+                self._drop(name)
+
+    def _drop(self, name:str):
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name:str) -> bool:
+        return name in self._entries
+
+    def stats(self) -> dict:
+        '''Returns the counters and memory use as a dict, e.g. for logging or benchmarks.'''
+        with self._lock:
+            return {"entries": len(self._entries), "nbytes": self.nbytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
\ No newline at end of file
@@ -6,19 +6,37 @@ class MacroConfigurator:
     IDENTIFIER = "VALID_MACRO" #string identifier to check that
 
     @staticmethod
-    def config_macro(macro:ActionManager | list[Action]) -> dict:
+    def config_macro(macro:ActionManager | ActionStore | list[Action]) -> dict:
         '''Creates and returns a dict containing the serialized macro and the identifier.'''
+        settings = {}
         if isinstance(macro, ActionManager):
             serialized_macro = macro.to_dict_list()
-        elif isinstance(macro, list[dict]):
+            settings = macro.save.settings
+        elif isinstance(macro, ActionStore):
+            serialized_macro = macro.to_dict_list()
+            settings = macro.settings
+        elif isinstance(macro, list):
             serialized_macro = [action.to_dict() for action in macro]
         else:
             raise ValueError("Invalid macro format.")
         return {
             "Identifier": MacroConfigurator.IDENTIFIER,
+            "Playback": dict(settings),
             "Macro": serialized_macro
         }
     
+    @staticmethod
+    def to_store(macro:ActionManager | ActionStore | list[Action]) -> ActionStore:
+        '''Returns the macro's actions as an ActionStore without copying when it already holds one.'''
+        if isinstance(macro, ActionManager):
+            return macro.save
+        elif isinstance(macro, ActionStore):
+            return macro
+        elif isinstance(macro, list):
+            return ActionStore(macro)
+        else:
+            raise ValueError("Invalid macro format.")
+
     @staticmethod
     def validate_macro(data:dict) -> bool:
         '''Checks the input dict for the Identifier key value pair.'''
@@ -27,10 +45,12 @@ class MacroConfigurator:
         return data["Identifier"] == MacroConfigurator.IDENTIFIER
     
     @staticmethod
-    def strip_macro(data:dict) -> list[Action]:
-        '''Basically reverse of config_macro(). Takes the valid macro dict and returns a list of Actions.'''
+    def strip_macro(data:dict) -> ActionStore:
+        '''Basically reverse of config_macro(). Takes the valid macro dict and returns its actions as an ActionStore.'''
         if not MacroConfigurator.validate_macro(data=data):
             print("Invalid macro.")
             return
         macro = data["Macro"]
-        return [Action.from_dict(action) for action in macro]
\ No newline at end of file
+        store = ActionStore.from_dict_list(macro)
+        store.settings = dict(data.get("Playback", {})) #saves from before playback settings have none
+        return store
\ No newline at end of file
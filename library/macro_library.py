@@ -1,7 +1,13 @@
 import os
 from .macro_configurator import MacroConfigurator
-from library.json_helpers import save_as_json, retrieve_from_json 
+from library.json_helpers import save_as_json, retrieve_from_json, peek_json_key, iter_json_array, encode_json
+from library.index_manifest import IndexManifest
+from library.macro_cache import MacroCache
+from library.binary_helpers import encode_binary, retrieve_from_binary, iter_binary_actions, read_header, MappedMacro, EXTENSION as BINARY_EXTENSION
+from library.macro_archive import write_archive, iter_archive, DEFAULT_METHOD as ARCHIVE_METHOD
+from library.persistence import PersistenceWorker, TEMP_SUFFIX, atomic_write
 from macro import *
+from typing import Iterable, Iterator
 import json
 
 class MacroLibrary:
@@ -12,33 +18,62 @@ class MacroLibrary:
 
     DEFAULT_HOTKEY = "Key.f6" #if settings saving fails, falls back to this
 
-    def __init__(self, folder_path:str):
+    LOAD_ERRORS = (ValueError, OSError, TypeError, KeyError, AttributeError) #what reading a damaged or hand edited save can raise
+
+    BACKUP_SUFFIX = ".bak" #appended to JSON saves replaced by migrate_json_saves()
+
+    CACHE_BYTES = 64 * 1024 * 1024 #default memory budget of the parsed macro cache, roughly 3M actions
+
+    def __init__(self, folder_path:str, cache_bytes:int = CACHE_BYTES, writer:PersistenceWorker | None = None):
         '''
         Docstring for __init__
         
         :param self: self
         :param folder_path: Path to folder which acts as the macro save folder.
         :type folder_path: str
+        :param cache_bytes: memory budget in bytes for parsed macros kept by retrieve_macro(), 0 disables the cache.
+        :type cache_bytes: int
+        :param writer: worker that writes saves, settings and the manifest in the background. None uses the process-wide PersistenceWorker.
+        :type writer: PersistenceWorker | None
         '''
 
         self.save_folder = folder_path #save folder
+        self.writer = writer if writer is not None else PersistenceWorker.shared() #see flush()
 
         self.settings_folder = os.path.join(folder_path, "settings")
         os.makedirs(self.settings_folder, exist_ok=True)
 
+        self._settings = None #cached contents of settings.json, read once by load_settings()
         self._create_settings()
         
+        self.manifest = IndexManifest(self.settings_folder, self.writer) #remembers validation results between runs
+        self.cache = MacroCache(cache_bytes) #parsed macros, see cache.stats() for hit/miss/eviction counters
         self.index = {} #dict mapping macro file names to their path
         self._fix_index()
     
     @staticmethod
-    def _validate_file(file_path:str) -> bool:
-        '''Wrapper for retrieve_from_json() and MacroConfig.validate_macro(). Checks file for valid JSON and a valid macro.'''
+    def _check_file(file_path:str) -> int | None:
+        '''Returns the format version of a valid macro file (0 for JSON), or None if it isn't one. Only headers are read unless a JSON file doesn't start with the Identifier.'''
+        if file_path.endswith(BINARY_EXTENSION):
+            try:
+                version, count = read_header(file_path=file_path)
+            except (ValueError, OSError):
+                return None
+            return version
+        if not file_path.endswith(".json"):
+            return None
         try:
-            data = retrieve_from_json(file_path=file_path)
-        except ValueError: #retreive_from_json throws ValueErrors
-            return False
-        return MacroConfigurator.validate_macro(data=data)
+            if peek_json_key(file_path, "Identifier", MacroConfigurator.IDENTIFIER):
+                return 0
+            data = retrieve_from_json(file_path=file_path) #Identifier isn't first, e.g. a hand edited file, so fall back to a full decode
+        except (ValueError, OSError): #retreive_from_json throws ValueErrors
+            return None
+        return 0 if isinstance(data, dict) and MacroConfigurator.validate_macro(data=data) else None
+
+    @staticmethod
+    def _validate_file(file_path:str) -> bool:
+        '''Wrapper for _check_file(). Checks file for a valid binary or JSON macro.'''
+        return MacroLibrary._check_file(file_path) is not None
 
     @staticmethod
     def validate_name(name:str):
@@ -51,43 +86,201 @@ class MacroLibrary:
             raise ValueError("Invalid name: name too long.")
 
     def _fix_index(self):
-        '''Scans the save folder and populates index with valid macro json files.'''
+        '''Scans the save folder and populates index with valid macro files, re-validating only files the manifest hasn't seen at their current size and mtime. A binary save wins over a JSON save with the same name.'''
+        files = set()
         for file in os.listdir(self.save_folder):
             file_path = os.path.join(self.save_folder, file)
-            if MacroLibrary._validate_file(file_path):
-                name = file[:-5]
+            if not os.path.isfile(file_path):
+                continue
+            if file.endswith(TEMP_SUFFIX): #left by a write interrupted by a crash, the save itself still holds its previous contents
+                if not self.writer.is_pending(file_path[:-len(TEMP_SUFFIX)]):
+                    os.remove(file_path)
+                continue
+            files.add(file)
+            entry = self._manifest_entry(file)
+            if entry["valid"]:
+                name = entry["name"]
+                if name in self.index and self.index[name].endswith(BINARY_EXTENSION):
+                    continue
                 self.index[name] = file_path
+        self.manifest.prune(files)
+        self.manifest.save()
+
+    def _manifest_entry(self, file:str) -> dict:
+        '''Returns the manifest entry for a file in the save folder, validating the file if the entry is missing or stale.'''
+        file_path = os.path.join(self.save_folder, file)
+        stat = os.stat(file_path)
+        entry = self.manifest.lookup(file, stat)
+        if entry is None:
+            entry = self.manifest.update(file, os.path.splitext(file)[0], file_path, stat, MacroLibrary._check_file(file_path))
+        return entry
 
     def index_collision(self, name:str) -> bool:
         '''Checks if name is a key in index. If so, return True, else return False.'''
         return name in self.index
     
-    def save_macro(self, macro:ActionManager | list[Action], name:str, overwrite:bool = False):
-        '''Saves a macro. If overwrite is True, then the existing save with the same name is overwritten.'''
+    def save_macro(self, macro:ActionManager | ActionStore | list[Action], name:str, overwrite:bool = False):
+        '''Saves a macro in the binary format. If overwrite is True, then the existing save with the same name is overwritten. The file is written in the background, see flush().'''
         self.validate_name(name)
-        serialized_macro = MacroConfigurator.config_macro(macro)
-        file_path = os.path.join(self.save_folder, f'{name}.json')
+        store = MacroConfigurator.to_store(macro)
         if self.index_collision(name):
             if overwrite:
                 pass
             else:
                 return
-        save_as_json(serialized_macro, file_path)
+        self._write_macro(store, name)
+        self.manifest.save()
+
+    def _write_macro(self, store:ActionStore, name:str, backup:bool = False):
+        '''Queues store as the binary save of name and updates the index and manifest entries, without saving the manifest file. An older JSON save of the same name is replaced synchronously instead, and only deleted (or renamed to a BACKUP_SUFFIX file if backup is True) once the binary save is on disk, so a failed write raises OSError and leaves the JSON save indexed.'''
+        file_path = os.path.join(self.save_folder, f'{name}{BINARY_EXTENSION}')
+        self.cache.invalidate(name)
+        data = encode_binary(store) #encoded now, the caller may keep editing store
+        old_path = self.index.get(name)
+        if old_path is not None and old_path != file_path:
+            self.writer.flush(file_path)
+            atomic_write(file_path, data)
+            if backup:
+                os.replace(old_path, f'{old_path}{MacroLibrary.BACKUP_SUFFIX}')
+            else:
+                os.remove(old_path)
+            self.manifest.remove(os.path.basename(old_path))
+        else:
+            self.writer.submit(file_path, data)
         self.index[name] = file_path
+        self.manifest.remove(os.path.basename(file_path)) #the file isn't written yet, the next startup validates it
+
+    def _saved_path(self, name:str) -> str:
+        '''Returns the path of name's save once any queued write to it is on disk.'''
+        file_path = self.index[name]
+        self.writer.flush(file_path)
+        return file_path
+
+    def flush(self):
+        '''Blocks until every queued write is on disk. Call before the process exits, e.g. when the GUI closes.'''
+        self.writer.flush()
+
+    def retrieve_macro(self, name:str) -> ActionStore:
+        '''Retrieves a macro, from the cache if its file is unchanged since it was last parsed. Always returns a store the caller may edit. Raises FileNotFoundError if the macro save doesn't exist.'''
+        if not self.index_collision(name):
+            raise FileNotFoundError()
+        file_path = self._saved_path(name)
+        stat = os.stat(file_path)
+        macro = self.cache.get(name, stat)
+        if macro is not None:
+            return macro
+        if file_path.endswith(BINARY_EXTENSION):
+            macro = retrieve_from_binary(file_path)
+        else:
+            data = retrieve_from_json(file_path)
+            macro = MacroConfigurator.strip_macro(data)
+            if macro is None: #strip_macro() prints and returns None for invalid data
+                return macro
+        self.cache.put(name, stat, macro)
+        return macro.copy()
 
-    def retrieve_macro(self, name:str) -> list[Action]:
-        '''Retrieves a macro. Raises FileNotFoundError if the macro save doesn't exist.'''
+    def cached_macro(self, name:str) -> ActionStore | None:
+        '''Returns a copy of the macro if the cache holds an up to date version, without reading the file. Returns None otherwise.'''
+        file_path = self.index.get(name)
+        if file_path is None or name not in self.cache or self.writer.is_pending(file_path):
+            return None
+        try:
+            return self.cache.get(name, os.stat(file_path))
+        except OSError:
+            return None
+
+    def preview_macro(self, name:str) -> tuple[int, float]:
+        '''Returns (action count, duration in seconds) of a saved macro. Binary saves are only mapped, not loaded. Raises FileNotFoundError if the macro save doesn't exist.'''
+        if not self.index_collision(name):
+            raise FileNotFoundError()
+        file_path = self._saved_path(name)
+        if file_path.endswith(BINARY_EXTENSION):
+            with MappedMacro(file_path) as mapped:
+                return mapped.count, mapped.timestamps[-1] if mapped.count else 0.0 #saves are sorted by timestamp
+        store = self.retrieve_macro(name)
+        return len(store), max(store.timestamps, default=0.0)
+
+    def stream_macro(self, name:str) -> Iterator[Action]:
+        '''Yields a macro's Actions while reading the file, so memory stays bounded and the first action is available right away. Raises FileNotFoundError if the macro save doesn't exist.'''
         if not self.index_collision(name):
             raise FileNotFoundError()
-        data = retrieve_from_json(self.index[name])
-        macro = MacroConfigurator.strip_macro(data)
-        return macro
+        file_path = self._saved_path(name)
+        if file_path.endswith(BINARY_EXTENSION):
+            return iter_binary_actions(file_path)
+        if not MacroLibrary._validate_file(file_path):
+            raise ValueError("File does not contain a valid macro")
+        return (Action.from_dict(action) for action in iter_json_array(file_path, "Macro"))
+
+    def export_json(self, name:str, file_path:str):
+        '''Writes a saved macro to a JSON file outside the library. Raises FileNotFoundError if the macro save doesn't exist.'''
+        save_as_json(MacroConfigurator.config_macro(self.retrieve_macro(name)), file_path)
+
+    def import_json(self, file_path:str, name:str, overwrite:bool = False):
+        '''Saves the macro in a JSON file under name. Raises ValueError if the file isn't a valid macro.'''
+        data = retrieve_from_json(file_path)
+        if not MacroConfigurator.validate_macro(data):
+            raise ValueError("File does not contain a valid macro")
+        self.save_macro(MacroConfigurator.strip_macro(data), name, overwrite=overwrite)
+
+    def export_archive(self, file_path:str, names:Iterable[str] | None = None, method:str = ARCHIVE_METHOD) -> int:
+        '''Writes the named saves (every save by default) into one compressed archive file, see macro_archive. Saves that can't be loaded are reported and left out. Returns how many were written. Raises FileNotFoundError if a named save doesn't exist.'''
+        names = sorted(self.index) if names is None else list(names)
+        for name in names:
+            if not self.index_collision(name):
+                raise FileNotFoundError()
+        return write_archive(file_path, self._iter_exportable(names), method)
+
+    def _iter_exportable(self, names:list[str]) -> Iterator[tuple[str, ActionStore]]:
+        for name in names:
+            try:
+                store = self.retrieve_macro(name)
+            except MacroLibrary.LOAD_ERRORS as error: #one damaged save must not abort the whole archive
+                print(f'Could not export {name}: {error}')
+                continue
+            if store is not None:
+                yield name, store
+
+    def import_archive(self, file_path:str, names:Iterable[str] | None = None, overwrite:bool = False) -> list[str]:
+        '''Saves the named macros (every macro by default) of an archive file, decoding one at a time straight into the library. Existing saves are only replaced if overwrite is True. Returns the names that were saved. Raises ValueError if the file isn't a valid archive or holds an invalid name.'''
+        imported = []
+        try:
+            for name, store in iter_archive(file_path, names):
+                if store is None or (self.index_collision(name) and not overwrite):
+                    continue
+                self.validate_name(name)
+                self._write_macro(store, name)
+                imported.append(name)
+        finally:
+            self.manifest.save() #once for the whole archive instead of once per macro
+        return imported
+
+    def json_saves(self) -> list[str]:
+        '''Returns the names of the saves still in the JSON format, see migrate_json_saves().'''
+        return [name for name, file_path in self.index.items() if not file_path.endswith(BINARY_EXTENSION)]
+
+    def migrate_json_saves(self) -> int:
+        '''Converts every indexed JSON save into the binary format. Only runs when called, e.g. from the GUI. Each binary save is written synchronously and the JSON file then renamed to a BACKUP_SUFFIX file, which the library ignores. A save whose conversion fails stays indexed as JSON. Returns how many saves were converted.'''
+        converted = 0
+        try:
+            for name in self.json_saves():
+                try:
+                    self._write_macro(self.retrieve_macro(name), name, backup=True)
+                except MacroLibrary.LOAD_ERRORS as error: #leave saves that can't be converted as JSON, one bad file must not stop the others
+                    print(f'Could not convert {name}: {error}')
+                    continue
+                converted += 1
+        finally:
+            self.manifest.save() #once for all saves instead of once per save
+        return converted
     
     def delete_macro(self, name:str):
         '''Deletes a macro. Raises FileNotFoundError if the macro save doesn't exist.'''
         if not self.index_collision(name):
             raise FileNotFoundError()
-        os.remove(self.index[name])
+        self.cache.invalidate(name)
+        self.writer.remove(self.index[name])
+        self.manifest.remove(os.path.basename(self.index[name]))
+        self.manifest.save()
         self.index.pop(name)
 
     #settings dict format is the following: {"start_stop_hotkey": str} where the str objects should come from input_conversion. If they are None, then they aren't changed.
@@ -97,20 +290,24 @@ class MacroLibrary:
             return
         data = {"start_stop_hotkey": MacroLibrary.DEFAULT_HOTKEY}
         path = self.settings_folder
-        save_as_json(data=data, file_path=os.path.join(path, "settings.json"))
+        self._settings = data
+        self.writer.submit(os.path.join(path, "settings.json"), encode_json(data))
 
     def load_settings(self) -> dict:
-        path = os.path.join(self.settings_folder, "settings.json")
-        data = retrieve_from_json(file_path=path)
-        if not isinstance(data, dict):
-            return
-        else:
-            return data
+        '''Returns a copy of the settings, reading settings.json only the first time.'''
+        if self._settings is None:
+            path = os.path.join(self.settings_folder, "settings.json")
+            data = retrieve_from_json(file_path=path)
+            if not isinstance(data, dict):
+                return
+            self._settings = data
+        return dict(self._settings)
 
     def save_settings(self, new_settings:dict = {"start_stop_hotkey": None}):
-        '''Accesses the unique settings.json file and sets the settings that changed.'''
+        '''Sets the settings that changed and queues the unique settings.json file to be rewritten.'''
         old_settings = self.load_settings()
         for key in old_settings.keys():
             if new_settings[key] is not None:
                 old_settings[key] = new_settings[key]
-        save_as_json(old_settings, os.path.join(self.settings_folder, "settings.json"))
\ No newline at end of file
+        self._settings = old_settings
+        self.writer.submit(os.path.join(self.settings_folder, "settings.json"), encode_json(old_settings))
\ No newline at end of file
@@ -0,0 +1,107 @@
+import atexit
+import os
+import threading
+
+TEMP_SUFFIX = ".tmp" #files being written, never valid saves
+
+def atomic_write(file_path:str, data:bytes):
+    '''Function writes data to a temporary file next to file_path, syncs it to disk and renames it over file_path, so file_path always holds either the old or the new contents.'''
+    temp_path = f'{file_path}{TEMP_SUFFIX}'
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if os.name == "posix": #the rename itself is only durable once the folder is synced
+        folder = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+        try:
+            os.fsync(folder)
+        finally:
+            os.close(folder)
+
+class PersistenceWorker:
+    '''Class writing files on a background thread with atomic_write(), so saving never blocks the caller on disk. Writes queued for a file that hasn't been written yet replace each other, only the latest contents are written.'''
+
+    _shared = None #process-wide worker returned by shared()
+
+    def __init__(self):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        '''
+        self._pending = {} #maps file paths to the bytes to write, or None to delete the file, in queue order
+        self._writing = None #path the worker thread is writing right now
+        self._condition = threading.Condition() #guards the above and _thread, notified whenever they change
+        self._thread = None
+        self.coalesced = 0 #writes replaced by a later write to the same file before reaching disk
+        self.written = 0 #files written or deleted
+        self.failures = 0 #writes that raised, see the printed error
+        atexit.register(self.flush)
+
+    @classmethod
+    def shared(cls):
+        '''Returns the process-wide worker, creating it on first use.'''
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def submit(self, file_path:str, data:bytes):
+        '''Queues data to be written to file_path, replacing a queued write to the same file.'''
+        self._queue(file_path, data)
+
+    def remove(self, file_path:str):
+        '''Queues file_path to be deleted after any write to it that is already in progress, replacing a queued write to the same file.'''
+        self._queue(file_path, None)
+
+    def _queue(self, file_path:str, data:bytes | None):
+        with self._condition:
+            if file_path in self._pending:
+                self.coalesced += 1
+            self._pending[file_path] = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def is_pending(self, file_path:str) -> bool:
+        '''Returns True if file_path has a queued or in progress write.'''
+        with self._condition:
+            return file_path in self._pending or self._writing == file_path
+
+    def flush(self, file_path:str | None = None):
+        '''Blocks until every queued write (only those to file_path if given) is on disk. Registered with atexit, the GUI also calls it when its window closes.'''
+        with self._condition:
+            if file_path is None:
+                self._condition.wait_for(lambda: not self._pending and self._writing is None)
+            else:
+                self._condition.wait_for(lambda: file_path not in self._pending and self._writing != file_path)
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                file_path = next(iter(self._pending))
+                data = self._pending.pop(file_path)
+                self._writing = file_path
+            try:
+                if data is None:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                else:
+                    atomic_write(file_path, data)
+                self.written += 1
+            except OSError as error: #the previous contents are left in place
+                self.failures += 1
+                print(f'Failed to write {file_path}: {error}')
+            finally:
+                with self._condition:
+                    self._writing = None
+                    self._condition.notify_all()
\ No newline at end of file
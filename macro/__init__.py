@@ -2,5 +2,14 @@
 
 from .action import Action
 from .action_manager import ActionManager
-from .input_conversion import key_to_str, str_to_key, button_to_str, str_to_button
-__all__ = ["Action", "ActionManager", "key_to_str", "str_to_key", "button_to_str", "str_to_button"]
\ No newline at end of file
+from .action_store import ActionStore
+from .scheduler import DeadlineScheduler
+from .virtual_clock import VirtualClock
+from .macro_executor import MacroExecutor
+from .async_scheduler import AsyncScheduler
+from .playback_events import PlaybackEvent
+from .playback_telemetry import PlaybackTelemetry, LatencyHistogram
+from .input_manager import InputManager
+from .input_backends import InputBackend, PynputBackend, BatchedBackend, RecordingBackend
+from .input_conversion import key_to_str, str_to_key, button_to_str, str_to_button, input_to_str, str_to_input, encode_many, decode_many
+__all__ = ["Action", "ActionManager", "ActionStore", "DeadlineScheduler", "VirtualClock", "MacroExecutor", "AsyncScheduler", "PlaybackEvent", "PlaybackTelemetry", "LatencyHistogram", "InputManager", "InputBackend", "PynputBackend", "BatchedBackend", "RecordingBackend", "key_to_str", "str_to_key", "button_to_str", "str_to_button", "input_to_str", "str_to_input", "encode_many", "decode_many"]
\ No newline at end of file
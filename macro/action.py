@@ -1,19 +1,21 @@
 from .input_manager import InputManager
 from pynput import mouse, keyboard
-from .input_conversion import key_to_str, str_to_key, button_to_str, str_to_button
+from .input_conversion import input_to_str, str_to_input
 from typing import Self
 
 class Action:
-    '''Class representing one base unit for a macro.'''
+    '''Class representing one base unit for a macro. Actions compare equal when all their fields match.'''
+
+    __slots__ = ("type", "input", "timestamp", "location")
 
     def __init__(self, type:str, input:mouse.Button | keyboard.Key | keyboard.KeyCode, timestamp:float, location:tuple[int,int] = None):
         '''
         Docstring for __init__
         
         :param self: self
-        :param type: "key_down", "key_up", "mouse_down", or "mouse_up" corresponding to key/mouse down or up.
+        :param type: "key_down", "key_up", "mouse_down", "mouse_up", or "mouse_move" corresponding to key/mouse down or up, or a cursor movement.
         :type type: str
-        :param input: the pynput object of the key or mouse button to be pressed/released.
+        :param input: the pynput object of the key or mouse button to be pressed/released. None for mouse_move.
         :type input: mouse.Button | keyboard.Key | keyboard.KeyCode
         :param timestamp: time in seconds representing when to activate.
         :type timestamp: float
@@ -23,13 +25,22 @@ class Action:
         self.type = type
         self.input = input
         self.timestamp = timestamp
-        self.location = location
+        self.location = tuple(location) if location is not None else None #JSON gives lists
+
+    def _fields(self) -> tuple:
+        return (self.type, self.input, self.timestamp, self.location)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Action):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
 
     def activate(self) -> bool:
-        '''Activates the input according to this instance's attributes, then returns True for a down event and False for an up event.'''
+        '''Activates the input according to this instance's attributes, then returns True for a down event and False for an up event. Mouse events without a location act at the current cursor position without moving it.'''
         location = self.location
-        if location is None:
-            location = InputManager.MOUSE.position
         match self.type:
             case "key_down":
                 InputManager.key_down(self.input)
@@ -38,30 +49,29 @@ class Action:
                 InputManager.key_up(self.input)
                 return False
             case "mouse_down":
-                InputManager.move_cursor(location[0], location[1])
-                InputManager.mouse_down(self.input)
+                if location is None:
+                    InputManager.mouse_down(self.input)
+                else:
+                    InputManager.mouse_down_at(self.input, location[0], location[1])
                 return True
             case "mouse_up":
-                InputManager.move_cursor(location[0], location[1])
-                InputManager.mouse_up(self.input)
+                if location is None:
+                    InputManager.mouse_up(self.input)
+                else:
+                    InputManager.mouse_up_at(self.input, location[0], location[1])
+                return False
+            case "mouse_move":
+                if location is not None: #a move to the current position does nothing
+                    InputManager.move_cursor(location[0], location[1])
                 return False
             case _:
                 raise ValueError("Invalid type.")
             
     def to_dict(self) -> dict:
         '''Returns this instance's data as a dict for serialization.'''
-        #convert input to a str
-        input = self.input
-        if isinstance(input, mouse.Button):
-            input = button_to_str(input)
-        elif isinstance(input, keyboard.Key) or isinstance(input, keyboard.KeyCode):
-            input = key_to_str(input)
-        else:
-            input = str(input)
-
         return {
             "type": self.type,
-            "input": input,
+            "input": input_to_str(self.input), #convert input to a str
             "timestamp": self.timestamp,
             "location": self.location
         }
@@ -72,9 +82,9 @@ class Action:
         #convert back to pynput object
         input = data["input"]
         if data["type"] == "mouse_down" or data["type"] == "mouse_up":
-            input = str_to_button(input)
+            input = str_to_input(input, is_mouse=True)
         elif data["type"] == "key_down" or data["type"] == "key_up":
-            input = str_to_key(input)
+            input = str_to_input(input, is_mouse=False)
         else:
             pass
 
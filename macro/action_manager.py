@@ -1,95 +1,252 @@
 from .action import Action
-import heapq
-import itertools
-from typing import Self
-import time
+from .action_store import ActionStore
+from .playback_plan import PlaybackPlan
+from .playback_cursor import PlaybackCursor, StreamCursor
+from .playback_events import PlaybackEvent
+from .async_scheduler import AsyncScheduler
+from . import macro_optimizer
+from .scheduler import DeadlineScheduler
+from .virtual_clock import VirtualClock
+from .input_manager import InputManager
+from array import array
+from typing import AsyncIterator, Callable, Iterable, Self
+import asyncio
 import threading
 
 class ActionManager:
     '''Class for managing actions: data conversion, ordering, execution.'''
 
-    INTERVAL = 0.001 #interval in seconds denoting how frequently actions are polled for
-
-    def __init__(self, save:list[Action] | None = None):
+    def __init__(self, save:ActionStore | list[Action] | None = None, scheduler:DeadlineScheduler | VirtualClock | None = None, executor = None):
         '''
         Docstring for __init__
         
         :param self: self
-        :param save: list of actions representing execution order for quick initialization.
-        :type save: list[Action] | None
+        :param save: actions representing execution order for quick initialization. An ActionStore is used as is, anything else is copied into a new one.
+        :type save: ActionStore | list[Action] | None
+        :param scheduler: clock that waits for each action's deadline during playback. None uses a balanced DeadlineScheduler, a VirtualClock simulates playback instead.
+        :type scheduler: DeadlineScheduler | VirtualClock | None
+        :param executor: MacroExecutor that start() hands playback to, sharing its thread with other macros. None runs each start() in its own thread with scheduler.
+        :type executor: MacroExecutor | None
         '''
-        self.save = list(save) if save is not None else [] #ensures save is a list
+        self.save = save if isinstance(save, ActionStore) else ActionStore(save) #ensures save is an ActionStore
+        self.save.sort() #save stays sorted by timestamp from here on, edits insert and remove in place
+        self.scheduler = scheduler if scheduler is not None else DeadlineScheduler()
+        self.executor = executor
 
-        self._counter = itertools.count() #for tie-breaking
-        self._execution_order = None #internal heap, type: list[tuple[float, int, Action]]
-        self._reset()
+        self._plan = None #compiled PlaybackPlan of save, rebuilt at playback start if save changed since
+        self._plan_source = None #(store, store.version, (speed, max_idle_gap)) the plan was compiled from
 
-        self._downed_actions:set[Action] = set()
+        self._downed = set() #inputs held down by playback, released through InputManager when it stops
 
         self.running:bool = False #acts like a start or stop flag, start is True, stop is False
         self.looping:bool = False #if True, execution will repeat upon reaching end
+        self._stop_event = threading.Event() #wakes the scheduler early when stop is called
+        self._async_scheduler = None #AsyncScheduler of the play() in progress, woken by stop
+
+        self.lateness = array("d") #seconds each action fired after its scheduled time, indexed like save. Overwritten in place on every loop
+        self.telemetry = None #PlaybackTelemetry collecting timing statistics across playbacks, None to skip the bookkeeping
+
+        self._change_listeners = [] #callables taking (kind, index), see subscribe_changes()
+        self._listeners = [] #callables taking a PlaybackEvent, see subscribe()
+
+    @property
+    def speed(self) -> float:
+        '''Playback speed multiplier, saved with the macro.'''
+        return self.save.settings.get("speed", 1.0)
+
+    @speed.setter
+    def speed(self, value:float):
+        if value <= 0:
+            raise ValueError("Invalid speed: must be positive.")
+        self.save.settings["speed"] = float(value)
+
+    @property
+    def max_idle_gap(self) -> float | None:
+        '''Longest idle gap in recorded seconds kept during playback, None keeps all. Saved with the macro.'''
+        return self.save.settings.get("max_idle_gap")
+
+    @max_idle_gap.setter
+    def max_idle_gap(self, value:float | None):
+        if value is not None and value < 0:
+            raise ValueError("Invalid idle gap: negative.")
+        self.save.settings["max_idle_gap"] = None if value is None else float(value)
+
+    def _compile(self) -> PlaybackPlan:
+        '''Returns the PlaybackPlan for save, compiling a new one only if save or the playback settings changed since the last call.'''
+        self.save.sort()
+        source = self._plan_source
+        settings = (self.speed, self.max_idle_gap)
+        if self._plan is None or source[0] is not self.save or source[1] != self.save.version or source[2] != settings:
+            self._plan = PlaybackPlan(self.save, *settings)
+            self._plan_source = (self.save, self.save.version, settings)
+        return self._plan
 
-    def _reset(self):
-        '''Sorts the internal save based on the Actions' timestamps, then sets _execution_order to a copy of save and heapifies it.'''
-        self.save.sort(key=lambda a: a.timestamp)
-        self._execution_order = [(action.timestamp, next(self._counter), action) for action in self.save]
-        heapq.heapify(self._execution_order)
+    def subscribe_changes(self, callback:Callable[[str, int | None], None]):
+        '''Registers callback(kind, index) to be called after each edit of self.save: ("insert", index) from add_action(), ("delete", index) from remove_action(), or ("reset", None) when save changed as a whole.'''
+        self._change_listeners.append(callback)
 
-    def add_action(self, action:Action):
-        '''Appends an action to self.save then resets to propagate changes.'''
-        self.save.append(action)
-        self._reset()
+    def unsubscribe_changes(self, callback:Callable[[str, int | None], None]):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def _notify_change(self, kind:str, index:int | None = None):
+        for callback in list(self._change_listeners): #copy so callbacks can unsubscribe
+            callback(kind, index)
+
+    def subscribe(self, callback:Callable[[PlaybackEvent], None]):
+        '''Registers callback to receive every PlaybackEvent of this manager's playbacks. It is called from the playback thread, event loop or whichever thread started playback, and must return quickly. Without subscribers no events are built.'''
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback:Callable[[PlaybackEvent], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _publish(self, event:PlaybackEvent):
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e: #a broken subscriber must not stop playback
+                print(f'Playback event callback failed: {e}')
+
+    def add_action(self, action:Action) -> int:
+        '''Inserts an action into self.save at its timestamp's position and returns its index.'''
+        index = self.save.insort(action)
+        self._notify_change("insert", index)
+        return index
 
     def remove_action(self, action:Action):
         '''Removes an action if it is in self.save, otherwise prints an error message and returns.'''
-        if action in self.save:
-            self.save.remove(action)
-            self._reset()
-        else:
+        try:
+            index = self.save.find_sorted(action)
+        except ValueError:
             print("Action removal failed: action not found.")
+            return
+        del self.save[index]
+        self._notify_change("delete", index)
+
+    def optimize(self, passes:Iterable[str] | None = None) -> dict[str, int]:
+        '''Removes redundant events from self.save, see macro_optimizer.PASSES. Returns how many injected events each pass saved.'''
+        report = macro_optimizer.optimize(self.save, passes)
+        if any(report.values()):
+            self._notify_change("reset")
+        return report
 
     def _resolve_downed(self):
-        '''Generates and executes inverse actions (up events) for each action of type key_down or mouse_down, then clears the set.'''
-        inverse_map = {"key_down": "key_up", "mouse_down": "mouse_up"}
-        for action in self._downed_actions:
-            inverse_type = inverse_map[action.type]
-            inverse_action = Action(type=inverse_type, input=action.input, timestamp=None) #timestamp isn't necessary here
-            inverse_action.activate()
-        self._downed_actions.clear()
+        '''Releases every input that playback left held down, through InputManager.release() so inputs its shadow already sees released, e.g. by another macro since, are skipped. Then clears the set.'''
+        InputManager.release(self._downed)
+        self._downed.clear()
+
+    def _publish_empty(self):
+        '''Publishes "started" and "stopped" for a playback of an empty macro, so listeners waiting for "stopped" aren't left waiting.'''
+        self.running = False
+        if self._listeners:
+            self._publish(PlaybackEvent("started", offset=0.0))
+            self._publish(PlaybackEvent("stopped"))
 
     def _run(self):
-        '''Starts running macro.'''
-        self._reset()
+        '''Starts running macro in the calling thread, one PlaybackCursor step per action.'''
+        plan = self._compile()
         self.running = True
-        start = time.perf_counter()
-        if not self._execution_order:
-            self.running = False
-            print("Macro cannot run: is empty")
+        self._stop_event.clear()
+        if not len(plan):
+            self._publish_empty()
             return
-        next_item = heapq.heappop(self._execution_order) #reminder: _execution_order contains a tuple with the Action object at [2]
-        next_time = start + next_item[2].timestamp
-        while self.running:
-            if time.perf_counter() >= next_time:
-                next_action = next_item[2]
-                if next_action.activate(): #activate does the action no matter what and returns boolean
-                    self._downed_actions.add(next_action)
-                else:
-                    self._downed_actions.discard(next_action)
-                if not self._execution_order:
-                    if self.looping:
-                        self._reset()
-                        start = time.perf_counter()
-                    else:
+        cursor = PlaybackCursor(self, plan, self.scheduler.now())
+        self._drive(cursor, cursor.deadline)
+
+    def _run_stream(self, source:Callable[[], Iterable[Action]]):
+        '''Runs actions as source() yields them, without storing the macro, so playback starts before it is fully loaded. Actions must come in timestamp order, late ones fire immediately. Loops call source() again. Uses this manager's speed and max_idle_gap, see StreamCursor.'''
+        self.running = True
+        self._stop_event.clear()
+        cursor = StreamCursor(self, source, self.scheduler.now())
+        self._drive(cursor, cursor.open)
+
+    def _drive(self, cursor:PlaybackCursor, first:Callable[[], float | None]):
+        '''Steps cursor in the calling thread, starting at the deadline first() returns, until playback is over or stop() is called. Then finishes it.'''
+        error = None
+        try:
+            deadline = first()
+            while deadline is not None and self.running:
+                if deadline > self.scheduler.now(): #nothing else is due this tick, so submit what a batching backend queued
+                    InputManager.flush()
+                lateness = self.scheduler.wait_until(deadline, self._stop_event)
+                if lateness is None: #stop was called while waiting
+                    break
+                deadline = cursor.step(lateness)
+        except Exception as e:
+            print(f'Macro playback failed: {e}')
+            error = e
+        cursor.finish(error)
+        InputManager.flush()
+
+    async def play(self, on_event:Callable[[PlaybackEvent], None] | None = None):
+        '''
+        Plays the macro on the running event loop without a thread, returning when playback ends. Cancelling the awaiting task stops playback and still releases held inputs.
+
+        :param on_event: subscribed for the duration of this playback, see subscribe().
+        :type on_event: Callable[[PlaybackEvent], None] | None
+        '''
+        plan = self._compile()
+        if on_event is not None:
+            self.subscribe(on_event)
+        if not len(plan):
+            self._publish_empty()
+            if on_event is not None:
+                self.unsubscribe(on_event)
+            return
+        scheduler = self._async_scheduler = AsyncScheduler()
+        self.running = True
+        error = None
+        try:
+            cursor = PlaybackCursor(self, plan, scheduler.now())
+            try:
+                deadline = cursor.deadline()
+                while self.running:
+                    if deadline > scheduler.now():
+                        InputManager.flush()
+                    lateness = await scheduler.wait_until(deadline)
+                    if lateness is None or not self.running: #stop was called
                         break
-                next_item = heapq.heappop(self._execution_order)
-                next_time = start + next_item[2].timestamp
-            time.sleep(ActionManager.INTERVAL)
-        self._resolve_downed()
-        self.running = False
-        self._reset()
+                    deadline = cursor.step(lateness)
+                    if deadline is None:
+                        break
+            except Exception as e:
+                error = e
+                raise
+            finally: #also runs when the task is cancelled
+                cursor.finish(error)
+                InputManager.flush()
+        finally:
+            self._async_scheduler = None
+            if on_event is not None:
+                self.unsubscribe(on_event)
+
+    async def play_events(self) -> AsyncIterator[PlaybackEvent]:
+        '''Plays the macro like play() and yields its PlaybackEvents as they happen, e.g. async for event in manager.play_events(). Closing it early, e.g. leaving an async with contextlib.aclosing(...) block, stops playback.'''
+        queue = asyncio.Queue()
+        task = asyncio.create_task(self.play(queue.put_nowait))
+        task.add_done_callback(lambda task: queue.put_nowait(None)) #None marks the end, also when play() returned without events
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            task.cancel() #no effect if play() already finished
+            try:
+                await task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling(): #the consumer itself is being cancelled
+                    raise
+
+    def start_stream(self, source:Callable[[], Iterable[Action]]):
+        '''Wrapper for self._run_stream() in a daemon thread, e.g. start_stream(lambda: library.stream_macro(name)). Ignores self.save.'''
+        macro_thread = threading.Thread(target=self._run_stream, args=(source,), daemon=True)
+        macro_thread.start()
 
     def start(self):
-        '''Essentially a wrapper for self._run() in a daemon thread to prevent blocking.'''
+        '''Essentially a wrapper for self._run() in a daemon thread to prevent blocking, or hands playback to self.executor if set.'''
+        if self.executor is not None:
+            self.executor.start(self)
+            return
         macro_thread = threading.Thread(target=self._run, daemon=True)
         if not macro_thread.is_alive():
             macro_thread.start()
@@ -97,13 +254,17 @@ class ActionManager:
     def stop(self):
         '''Stops execution.'''
         self.running = False
+        self._stop_event.set()
+        if self.executor is not None:
+            self.executor.stop(self)
+        if self._async_scheduler is not None:
+            self._async_scheduler.wake()
 
     def to_dict_list(self) -> list[dict]:
-        '''Converts self.save into a list of dicts for serialization.'''
-        return [action.to_dict() for action in self.save]
+        '''Converts self.save into a list of dicts for serialization, encoding each distinct input once.'''
+        return self.save.to_dict_list()
 
     @classmethod
     def from_dict_list(cls, data:list[dict]) -> Self:
-        '''Returns an instance of this class given an input list of dicts.'''
-        action_list = [Action.from_dict(action) for action in data]
-        return cls(save=action_list)
\ No newline at end of file
+        '''Returns an instance of this class given an input list of dicts, decoding each distinct input once.'''
+        return cls(save=ActionStore.from_dict_list(data))
\ No newline at end of file
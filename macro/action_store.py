@@ -0,0 +1,243 @@
+from .action import Action
+from .input_conversion import encode_many, decode_many
+from array import array
+import bisect
+import itertools
+from typing import Iterable, Iterator, Self
+
+class ActionStore:
+    '''Class storing a macro's actions column-wise in parallel typed arrays. Indexing returns a lightweight Action view.'''
+
+    TYPES = ("key_down", "key_up", "mouse_down", "mouse_up", "mouse_move") #type codes are indices into this tuple, only append so saved codes stay valid
+    TYPE_CODES = {type: code for code, type in enumerate(TYPES)}
+    MOUSE_TYPES = frozenset(("mouse_down", "mouse_up", "mouse_move"))
+    NO_LOCATION = -2**31 #x and y value of actions without a location
+
+    def __init__(self, actions:Iterable[Action] | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param actions: actions to copy into the store, kept in the given order.
+        :type actions: Iterable[Action] | None
+        '''
+        self.types = array("B") #type codes, see TYPES
+        self.inputs = array("I") #ids into input_table
+        self.timestamps = array("d")
+        self.xs = array("i")
+        self.ys = array("i")
+
+        self.input_table = [] #interned pynput objects, each distinct input is stored once
+        self._input_ids = {} #maps input object to its index in input_table
+
+        self.version = 0 #incremented on every change so compiled forms of the store know when they are stale
+        self.settings = {} #saved with the macro, e.g. {"speed": float, "max_idle_gap": float | None}
+
+        if actions is not None:
+            self.extend(actions)
+
+    def _intern(self, input) -> int:
+        '''Returns the id of input in input_table, adding it if it is new.'''
+        input_id = self._input_ids.get(input)
+        if input_id is None:
+            input_id = len(self.input_table)
+            self.input_table.append(input)
+            self._input_ids[input] = input_id
+        return input_id
+
+    @staticmethod
+    def _type_code(type:str) -> int:
+        '''Returns the code for an action type, raising a ValueError if the type is invalid.'''
+        code = ActionStore.TYPE_CODES.get(type)
+        if code is None:
+            raise ValueError(f'Invalid type: {type}')
+        return code
+
+    @staticmethod
+    def _round_location(location:tuple[int, int] | None) -> tuple[int, int] | None:
+        '''Returns location the way the columns hold it. pynput reports floats on macOS and scaled displays, the columns hold ints.'''
+        return None if location is None else (round(location[0]), round(location[1]))
+
+    def _write(self, index:int, type:str, input, timestamp:float, location:tuple[int, int] | None):
+        '''Writes one action's fields at index, which must be len(self) to append or an existing row to insert before.'''
+        code = ActionStore._type_code(type)
+        input_id = self._intern(input)
+        if location is None:
+            x = y = ActionStore.NO_LOCATION
+        else:
+            x, y = ActionStore._round_location(location)
+        self.version += 1
+        self.types.insert(index, code)
+        self.inputs.insert(index, input_id)
+        self.timestamps.insert(index, timestamp)
+        self.xs.insert(index, x)
+        self.ys.insert(index, y)
+
+    def append_values(self, type:str, input, timestamp:float, location:tuple[int, int] | None = None):
+        '''Appends an action given its fields, without creating an Action object.'''
+        self._write(len(self.types), type, input, timestamp, location)
+
+    def append(self, action:Action):
+        '''Appends a copy of action's fields.'''
+        self.append_values(action.type, action.input, action.timestamp, action.location)
+
+    def extend(self, actions:Iterable[Action]):
+        '''Appends every action in actions.'''
+        for action in actions:
+            self.append(action)
+
+    def insert(self, index:int, action:Action):
+        '''Inserts a copy of action's fields before index.'''
+        self._write(index, action.type, action.input, action.timestamp, action.location)
+
+    def type_at(self, index:int) -> str:
+        return ActionStore.TYPES[self.types[index]]
+
+    def input_at(self, index:int):
+        return self.input_table[self.inputs[index]]
+
+    def location_at(self, index:int) -> tuple[int, int] | None:
+        x = self.xs[index]
+        if x == ActionStore.NO_LOCATION:
+            return None
+        return (x, self.ys[index])
+
+    def set_location(self, index:int, location:tuple[int, int] | None):
+        self.version += 1
+        if location is None:
+            self.xs[index] = self.ys[index] = ActionStore.NO_LOCATION
+        else:
+            self.xs[index], self.ys[index] = ActionStore._round_location(location)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index:int) -> Action:
+        '''Returns a new Action holding a copy of the fields at index. Editing it does not change the store.'''
+        return Action(type=self.type_at(index), input=self.input_at(index), timestamp=self.timestamps[index], location=self.location_at(index))
+
+    def __iter__(self) -> Iterator[Action]:
+        for index in range(len(self.types)):
+            yield self[index]
+
+    def __delitem__(self, index:int):
+        self.version += 1
+        del self.types[index]
+        del self.inputs[index]
+        del self.timestamps[index]
+        del self.xs[index]
+        del self.ys[index]
+
+    def pop(self, index:int = -1) -> Action:
+        action = self[index]
+        del self[index]
+        return action
+
+    def index(self, action:Action) -> int:
+        '''Returns the first index holding the same fields as action, comparing its location rounded like stored ones. Raises ValueError if there is none.'''
+        input_id = self._input_ids.get(action.input)
+        code = ActionStore.TYPE_CODES.get(action.type)
+        location = ActionStore._round_location(action.location)
+        if input_id is not None and code is not None:
+            for index, timestamp in enumerate(self.timestamps):
+                if timestamp == action.timestamp and self.types[index] == code and self.inputs[index] == input_id and self.location_at(index) == location:
+                    return index
+        raise ValueError("Action not in store.")
+
+    def __contains__(self, action:Action) -> bool:
+        try:
+            self.index(action)
+        except ValueError:
+            return False
+        return True
+
+    def remove(self, action:Action):
+        '''Removes the first action with the same fields as action. Raises ValueError if there is none.'''
+        del self[self.index(action)]
+
+    #the following methods require the store to be sorted by timestamp, e.g. after sort(), and keep it sorted
+    def bisect(self, timestamp:float) -> int:
+        '''Returns the index of the first action at or after timestamp.'''
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def insort(self, action:Action) -> int:
+        '''Inserts action after any actions with the same timestamp and returns its index.'''
+        index = bisect.bisect_right(self.timestamps, action.timestamp)
+        self.insert(index, action)
+        return index
+
+    def find_sorted(self, action:Action) -> int:
+        '''Same as index() but only scans the actions sharing action's timestamp. Raises ValueError if there is none.'''
+        input_id = self._input_ids.get(action.input)
+        code = ActionStore.TYPE_CODES.get(action.type)
+        location = ActionStore._round_location(action.location)
+        if input_id is not None and code is not None:
+            end = bisect.bisect_right(self.timestamps, action.timestamp)
+            for index in range(bisect.bisect_left(self.timestamps, action.timestamp, hi=end), end):
+                if self.types[index] == code and self.inputs[index] == input_id and self.location_at(index) == location:
+                    return index
+        raise ValueError("Action not in store.")
+
+    def sort(self):
+        '''Stable sorts every column by timestamp.'''
+        timestamps = self.timestamps
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        if all(index == position for position, index in enumerate(order)): #already sorted, nothing to move
+            return
+        self.version += 1
+        for name in ("types", "inputs", "timestamps", "xs", "ys"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[index] for index in order]))
+
+    def compress(self, keep:Iterable[bool]) -> int:
+        '''Keeps only the actions whose flag in keep is true, in one pass per column, and returns how many were removed.'''
+        keep = list(keep)
+        removed = len(keep) - sum(keep)
+        if removed:
+            self.version += 1
+            for name in ("types", "inputs", "timestamps", "xs", "ys"):
+                column = getattr(self, name)
+                setattr(self, name, array(column.typecode, itertools.compress(column, keep)))
+        return removed
+
+    def copy(self) -> Self:
+        '''Returns an independent copy of this store.'''
+        other = ActionStore()
+        other.types = array("B", self.types)
+        other.inputs = array("I", self.inputs)
+        other.timestamps = array("d", self.timestamps)
+        other.xs = array("i", self.xs)
+        other.ys = array("i", self.ys)
+        other.input_table = list(self.input_table)
+        other._input_ids = dict(self._input_ids)
+        other.settings = dict(self.settings)
+        return other
+
+    def nbytes(self) -> int:
+        '''Returns the approximate memory held by the columns, not counting the shared pynput objects.'''
+        return sum(column.itemsize * len(column) for column in (self.types, self.inputs, self.timestamps, self.xs, self.ys))
+
+    def to_dict_list(self) -> list[dict]:
+        '''Converts the store into a list of dicts for serialization. Each distinct input is converted to a string once.'''
+        names = encode_many(self.input_table)
+        types = ActionStore.TYPES
+        no_location = ActionStore.NO_LOCATION
+        return [
+            {
+                "type": types[type_code],
+                "input": names[input_id],
+                "timestamp": timestamp,
+                "location": None if x == no_location else (x, y)
+            }
+            for type_code, input_id, timestamp, x, y in zip(self.types, self.inputs, self.timestamps, self.xs, self.ys)
+        ]
+
+    @classmethod
+    def from_dict_list(cls, data:list[dict]) -> Self:
+        '''Returns a store built from a list of dicts in the Action.to_dict format, without creating Action objects.'''
+        store = cls()
+        types = [action["type"] for action in data]
+        inputs = decode_many((action["input"] for action in data), (type in ActionStore.MOUSE_TYPES for type in types))
+        for type, input, action in zip(types, inputs, data):
+            store.append_values(type, input, action["timestamp"], action["location"])
+        return store
\ No newline at end of file
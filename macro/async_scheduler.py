@@ -0,0 +1,48 @@
+import asyncio
+
+def _resolve(future:asyncio.Future, result:bool):
+    if not future.done():
+        future.set_result(result)
+
+class AsyncScheduler:
+    '''asyncio counterpart of DeadlineScheduler: waits for absolute deadlines on the running event loop's clock with loop.call_at, so playback needs no thread. Precision is that of the event loop's timer.'''
+
+    def __init__(self):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        '''
+        self._loop = None #event loop of the latest wait, used by wake() from other threads
+        self._waiting = None #future of the wait in progress
+
+    @staticmethod
+    def now() -> float:
+        '''Returns the running event loop's current time in seconds.'''
+        return asyncio.get_running_loop().time()
+
+    async def wait_until(self, deadline:float) -> float | None:
+        '''Sleeps until deadline (in now() time), then returns how many seconds late it woke up. Returns None if wake() was called while waiting. A deadline that already passed still yields to the event loop once, so a late burst of actions can't starve other tasks.'''
+        loop = self._loop = asyncio.get_running_loop()
+        if deadline <= loop.time():
+            await asyncio.sleep(0)
+        else:
+            future = self._waiting = loop.create_future()
+            handle = loop.call_at(deadline, _resolve, future, True)
+            try:
+                if not await future:
+                    return None
+            finally:
+                handle.cancel()
+                self._waiting = None
+        return loop.time() - deadline
+
+    def wake(self):
+        '''Makes the wait in progress return None. Safe to call from any thread.'''
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake_waiting)
+
+    def _wake_waiting(self):
+        if self._waiting is not None:
+            _resolve(self._waiting, False)
\ No newline at end of file
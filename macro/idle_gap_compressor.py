@@ -0,0 +1,41 @@
+class IdleGapCompressor:
+    '''Class mapping recorded timestamps to compressed ones, one action at a time in timestamp order, for one iteration of a macro. Gaps longer than max_gap are cut down to max_gap, except while an input is held across them, so chords and holds keep their timing. An input held for longer than MAX_HOLD is taken as stuck, e.g. its up was never recorded, and no longer stops compression.'''
+
+    DOWN_TYPES = frozenset(("key_down", "mouse_down"))
+    UP_TYPES = frozenset(("key_up", "mouse_up"))
+    MAX_HOLD = 60.0 #seconds an input may be held before it is taken as stuck
+
+    def __init__(self, max_gap:float | None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param max_gap: longest idle gap in seconds to keep. None disables compression.
+        :type max_gap: float | None
+        '''
+        if max_gap is not None and max_gap < 0:
+            raise ValueError("Invalid idle gap: negative.")
+        self.max_gap = max_gap
+        self._held = {} #maps inputs down after the previous action to the timestamp of their down
+        self._last = None #timestamp of the previous action
+        self._shift = 0.0 #seconds removed so far
+
+    def __call__(self, type:str, input, timestamp:float) -> float:
+        '''Returns timestamp moved earlier by the idle time cut before it.'''
+        if self.max_gap is not None and self._last is not None:
+            gap = timestamp - self._last
+            if gap > self.max_gap and not self._holding(timestamp):
+                self._shift += gap - self.max_gap
+        self._last = timestamp
+        if type in IdleGapCompressor.DOWN_TYPES:
+            self._held.setdefault(input, timestamp) #auto-repeat keeps the first down
+        elif type in IdleGapCompressor.UP_TYPES:
+            self._held.pop(input, None)
+        return timestamp - self._shift
+
+    def _holding(self, timestamp:float) -> bool:
+        '''Returns True if an input is held at timestamp, forgetting inputs held for longer than MAX_HOLD.'''
+        stuck = [input for input, down in self._held.items() if timestamp - down > IdleGapCompressor.MAX_HOLD]
+        for input in stuck:
+            del self._held[input]
+        return bool(self._held)
\ No newline at end of file
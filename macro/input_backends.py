@@ -0,0 +1,157 @@
+from pynput import mouse, keyboard
+import time
+
+class InputBackend:
+    '''Base class for the destinations InputManager sends input events to.'''
+
+    def move_cursor(self, x:int, y:int):
+        raise NotImplementedError()
+
+    def mouse_down(self, button:mouse.Button):
+        raise NotImplementedError()
+
+    def mouse_up(self, button:mouse.Button):
+        raise NotImplementedError()
+
+    def key_down(self, key:keyboard.Key | keyboard.KeyCode):
+        raise NotImplementedError()
+
+    def key_up(self, key:keyboard.Key | keyboard.KeyCode):
+        raise NotImplementedError()
+
+    def cursor_position(self) -> tuple[int, int]:
+        raise NotImplementedError()
+
+    def submit(self, events:list[tuple[str, tuple]]):
+        '''Injects a batch of (method name, args) events in order. Backends with a native batch call can override this.'''
+        for name, args in events:
+            getattr(self, name)(*args)
+
+    def flush(self):
+        '''Submits any queued events. Playback calls this once per scheduler tick, after every action due in that tick.'''
+        pass
+
+class PynputBackend(InputBackend):
+    '''Backend injecting events through pynput. The controllers are only created on first use, not at import.'''
+
+    def __init__(self):
+        self._mouse = None
+        self._keyboard = None
+
+    @property
+    def mouse_controller(self) -> mouse.Controller:
+        if self._mouse is None:
+            self._mouse = mouse.Controller()
+        return self._mouse
+
+    @property
+    def keyboard_controller(self) -> keyboard.Controller:
+        if self._keyboard is None:
+            self._keyboard = keyboard.Controller()
+        return self._keyboard
+
+    def move_cursor(self, x:int, y:int):
+        self.mouse_controller.position = (x, y)
+
+    def mouse_down(self, button:mouse.Button):
+        self.mouse_controller.press(button=button)
+
+    def mouse_up(self, button:mouse.Button):
+        self.mouse_controller.release(button=button)
+
+    def key_down(self, key:keyboard.Key | keyboard.KeyCode):
+        self.keyboard_controller.press(key=key)
+
+    def key_up(self, key:keyboard.Key | keyboard.KeyCode):
+        self.keyboard_controller.release(key=key)
+
+    def cursor_position(self) -> tuple[int, int]:
+        return self.mouse_controller.position
+
+class BatchedBackend(InputBackend):
+    '''Backend that queues events and hands everything due in the same tick to the wrapped backend's submit() in one go on flush().'''
+
+    def __init__(self, backend:InputBackend):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param backend: backend that receives the batches.
+        :type backend: InputBackend
+        '''
+        self.backend = backend
+        self._queue = []
+
+    def move_cursor(self, x:int, y:int):
+        self._queue.append(("move_cursor", (x, y)))
+
+    def mouse_down(self, button:mouse.Button):
+        self._queue.append(("mouse_down", (button,)))
+
+    def mouse_up(self, button:mouse.Button):
+        self._queue.append(("mouse_up", (button,)))
+
+    def key_down(self, key:keyboard.Key | keyboard.KeyCode):
+        self._queue.append(("key_down", (key,)))
+
+    def key_up(self, key:keyboard.Key | keyboard.KeyCode):
+        self._queue.append(("key_up", (key,)))
+
+    def cursor_position(self) -> tuple[int, int]:
+        for name, args in reversed(self._queue): #a queued move wins over the real position
+            if name == "move_cursor":
+                return args
+        return self.backend.cursor_position()
+
+    def flush(self):
+        if not self._queue:
+            return
+        queue, self._queue = self._queue, []
+        self.backend.submit(queue)
+        self.backend.flush()
+
+class RecordingBackend(InputBackend):
+    '''Backend that injects nothing and records every event with a timestamp instead, for headless tests and benchmarks.'''
+
+    def __init__(self, clock=time.perf_counter, record:bool = True):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param clock: callable returning the time stamped on each event.
+        :param record: if False, events are only counted, which makes this a null backend.
+        :type record: bool
+        '''
+        self.clock = clock
+        self.record = record
+        self.events = [] #list of (time, method name, args)
+        self.count = 0
+        self.position = (0, 0)
+
+    def _log(self, name:str, args:tuple):
+        self.count += 1
+        if self.record:
+            self.events.append((self.clock(), name, args))
+
+    def move_cursor(self, x:int, y:int):
+        self.position = (x, y)
+        self._log("move_cursor", (x, y))
+
+    def mouse_down(self, button:mouse.Button):
+        self._log("mouse_down", (button,))
+
+    def mouse_up(self, button:mouse.Button):
+        self._log("mouse_up", (button,))
+
+    def key_down(self, key:keyboard.Key | keyboard.KeyCode):
+        self._log("key_down", (key,))
+
+    def key_up(self, key:keyboard.Key | keyboard.KeyCode):
+        self._log("key_up", (key,))
+
+    def cursor_position(self) -> tuple[int, int]:
+        return self.position
+
+    def clear(self):
+        self.events.clear()
+        self.count = 0
\ No newline at end of file
@@ -1,35 +1,103 @@
 from pynput import mouse, keyboard
+from typing import Iterable
 
 #Helpers to convert pynput Key, KeyCode, and Button objects to strings and vice versa
+#Every conversion is memoized in both directions, so each distinct input maps to one canonical object and one string
+
+_KEY_STRS = {} #key object -> str
+_STR_KEYS = {} #str -> canonical key object
+_BUTTON_STRS = {} #button object -> str
+_STR_BUTTONS = {} #str -> button object
+
+def _intern(forward:dict, backward:dict, obj, s:str | None):
+    forward[obj] = s
+    if s is not None:
+        backward.setdefault(s, obj)
+    return s
 
 def key_to_str(key:keyboard.Key | keyboard.KeyCode):
+    try:
+        return _KEY_STRS[key]
+    except (KeyError, TypeError): #TypeError for unhashable inputs
+        pass
     if isinstance(key, keyboard.KeyCode) and key.char is not None:
-        return key.char
+        return _intern(_KEY_STRS, _STR_KEYS, key, key.char)
     elif isinstance(key, keyboard.Key):
-        return f'Key.{key.name}'
-    else: 
+        return _intern(_KEY_STRS, _STR_KEYS, key, f'Key.{key.name}')
+    else:
         return None
-    
+
 def str_to_key(s:str):
     if s is None:
         return None
+    key = _STR_KEYS.get(s)
+    if key is not None:
+        return key
     if s.startswith("Key."):
         name = s.split(".", 1)[1]
-        return getattr(keyboard.Key, name)
+        key = getattr(keyboard.Key, name)
     else:
-        return keyboard.KeyCode.from_char(s)
-    
+        key = keyboard.KeyCode.from_char(s)
+    _intern(_KEY_STRS, _STR_KEYS, key, s)
+    return _STR_KEYS[s]
+
 def button_to_str(button:mouse.Button):
+    try:
+        return _BUTTON_STRS[button]
+    except (KeyError, TypeError):
+        pass
     if isinstance(button, mouse.Button):
-        return f'Button.{button.name}'
+        return _intern(_BUTTON_STRS, _STR_BUTTONS, button, f'Button.{button.name}')
     else:
         return None
 
 def str_to_button(s:str):
     if s is None:
         return None
+    button = _STR_BUTTONS.get(s)
+    if button is not None:
+        return button
     if s.startswith("Button"):
         name = s.split(".", 1)[1]
-        return getattr(mouse.Button, name)
+        button = getattr(mouse.Button, name)
     else:
-        raise ValueError(f'Invalid mouse button string: {s}')
\ No newline at end of file
+        raise ValueError(f'Invalid mouse button string: {s}')
+    _intern(_BUTTON_STRS, _STR_BUTTONS, button, s)
+    return _STR_BUTTONS[s]
+
+def input_to_str(input:mouse.Button | keyboard.Key | keyboard.KeyCode | None):
+    '''Converts any pynput input to its string, or None for None. Other objects fall back to str().'''
+    if input is None:
+        return None
+    s = _BUTTON_STRS.get(input)
+    if s is not None:
+        return s
+    s = _KEY_STRS.get(input)
+    if s is not None:
+        return s
+    if isinstance(input, mouse.Button):
+        return button_to_str(input)
+    elif isinstance(input, (keyboard.Key, keyboard.KeyCode)):
+        return key_to_str(input)
+    else:
+        return str(input)
+
+def str_to_input(s:str | None, is_mouse:bool):
+    '''Converts a string back to its canonical pynput object, as a mouse button if is_mouse else as a key.'''
+    return str_to_button(s) if is_mouse else str_to_key(s)
+
+def encode_many(inputs:Iterable) -> list[str | None]:
+    '''Batch version of input_to_str().'''
+    return [input_to_str(input) for input in inputs]
+
+def decode_many(strings:Iterable[str | None], is_mouse:Iterable[bool]) -> list:
+    '''Batch version of str_to_input(). Each distinct (string, is_mouse) pair is only converted once.'''
+    decoded = {}
+    result = []
+    for s, mouse_flag in zip(strings, is_mouse):
+        pair = (s, mouse_flag)
+        input = decoded.get(pair, decoded)
+        if input is decoded: #decoded doubles as a sentinel since None is a valid result
+            input = decoded[pair] = str_to_input(s, mouse_flag)
+        result.append(input)
+    return result
@@ -1,31 +1,98 @@
 from pynput import mouse, keyboard
+from .input_backends import InputBackend, PynputBackend
+from .input_shadow import InputShadow
+from typing import Iterable
+import weakref
 
 class InputManager:
-    '''Wrapper class for pynput keyboard and mouse inputs.'''
-    MOUSE = mouse.Controller()
-    KEYBOARD = keyboard.Controller()
+    '''Wrapper class for keyboard and mouse inputs. Events go to the active InputBackend, pynput unless set_backend() is called. Each backend gets an InputShadow tracking what was injected into it, so state queries rarely reach the OS.'''
+    BACKEND:InputBackend = PynputBackend()
+    SHADOW:InputShadow = InputShadow() #shadow of BACKEND
+    _shadows = weakref.WeakKeyDictionary() #backend -> its InputShadow, kept while a backend is swapped out
+
+    @staticmethod
+    def set_backend(backend:InputBackend) -> InputBackend:
+        '''Routes all following events to backend, flushing the current one first. Returns the previous backend.'''
+        previous = InputManager.BACKEND
+        previous.flush()
+        InputManager._shadows[previous] = InputManager.SHADOW
+        InputManager.BACKEND = backend
+        InputManager.SHADOW = InputManager._shadows.pop(backend, None) or InputShadow()
+        return previous
+
+    @staticmethod
+    def cursor_position() -> tuple[int, int]:
+        '''Get the current mouse cursor pixel, from the shadow if it was set recently'''
+        position = InputManager.SHADOW.known_position()
+        if position is None:
+            x, y = InputManager.BACKEND.cursor_position()
+            InputManager.SHADOW.set_position(x, y)
+            position = (x, y)
+        return position
 
     @staticmethod
     def move_cursor(x:int, y:int):
         '''Move mouse cursor to exact pixel'''
-        InputManager.MOUSE.position = (x, y)
+        InputManager.SHADOW.set_position(x, y)
+        InputManager.BACKEND.move_cursor(x, y)
 
     @staticmethod
     def mouse_down(button:mouse.Button):
         '''Generate a mouse down event'''
-        InputManager.MOUSE.press(button=button)
+        InputManager.SHADOW.pressed.add(button)
+        InputManager.BACKEND.mouse_down(button)
     
     @staticmethod
     def mouse_up(button:mouse.Button):
         '''Generate a mouse up event'''
-        InputManager.MOUSE.release(button=button)
+        InputManager.SHADOW.pressed.discard(button)
+        InputManager.BACKEND.mouse_up(button)
+
+    @staticmethod
+    def mouse_down_at(button:mouse.Button, x:int, y:int):
+        '''Move mouse cursor to exact pixel, then generate a mouse down event'''
+        shadow, backend = InputManager.SHADOW, InputManager.BACKEND
+        shadow.set_position(x, y)
+        shadow.pressed.add(button)
+        backend.move_cursor(x, y)
+        backend.mouse_down(button)
+
+    @staticmethod
+    def mouse_up_at(button:mouse.Button, x:int, y:int):
+        '''Move mouse cursor to exact pixel, then generate a mouse up event'''
+        shadow, backend = InputManager.SHADOW, InputManager.BACKEND
+        shadow.set_position(x, y)
+        shadow.pressed.discard(button)
+        backend.move_cursor(x, y)
+        backend.mouse_up(button)
 
     @staticmethod
     def key_down(key:keyboard.Key | keyboard.KeyCode):
         '''Generate a key down event'''
-        InputManager.KEYBOARD.press(key=key)
+        InputManager.SHADOW.pressed.add(key)
+        InputManager.BACKEND.key_down(key)
 
     @staticmethod
     def key_up(key:keyboard.Key | keyboard.KeyCode):
         '''Generate a key up event'''
-        InputManager.KEYBOARD.release(key=key)
\ No newline at end of file
+        InputManager.SHADOW.pressed.discard(key)
+        InputManager.BACKEND.key_up(key)
+
+    @staticmethod
+    def release(inputs:Iterable) -> int:
+        '''Generate up events for those of inputs that are held down according to the shadow, returning how many were released'''
+        released = 0
+        for input in list(inputs):
+            if input not in InputManager.SHADOW.pressed:
+                continue
+            if isinstance(input, mouse.Button):
+                InputManager.mouse_up(input)
+            else:
+                InputManager.key_up(input)
+            released += 1
+        return released
+
+    @staticmethod
+    def flush():
+        '''Submit events a batching backend is holding'''
+        InputManager.BACKEND.flush()
\ No newline at end of file
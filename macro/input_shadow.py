@@ -0,0 +1,26 @@
+from time import perf_counter
+
+class InputShadow:
+    '''Class mirroring the input state InputManager injected: which keys and buttons it holds down and where it last put the cursor. Cursor queries are answered from the mirror while it is fresh, so the OS is only asked again after POSITION_TTL.'''
+
+    POSITION_TTL = 0.05 #seconds a known cursor position is trusted, the user may move the mouse in between
+
+    def __init__(self):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        '''
+        self.pressed = set() #keys and buttons injected down and not yet up
+        self.position = None #last cursor position injected or read, None if unknown
+        self.synced_at = 0.0 #perf_counter() time position was set
+
+    def set_position(self, x:int, y:int):
+        self.position = (x, y)
+        self.synced_at = perf_counter()
+
+    def known_position(self) -> tuple[int, int] | None:
+        '''Returns the mirrored cursor position if it is fresh enough to trust, otherwise None.'''
+        if self.position is not None and perf_counter() - self.synced_at < InputShadow.POSITION_TTL:
+            return self.position
+        return None
\ No newline at end of file
@@ -0,0 +1,114 @@
+from .playback_cursor import PlaybackCursor
+from .scheduler import DeadlineScheduler
+from .input_manager import InputManager
+import heapq
+import itertools
+import threading
+
+class MacroExecutor:
+    '''Class that plays any number of ActionManagers on one timer heap and one sleeping thread, instead of a thread per start(). Pass it to ActionManager(executor=...) or call start() and stop() directly.'''
+
+    _shared = None #process-wide executor returned by shared()
+
+    def __init__(self, scheduler:DeadlineScheduler | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param scheduler: waits for the earliest deadline on the heap. None uses a balanced DeadlineScheduler.
+        :type scheduler: DeadlineScheduler | None
+        '''
+        self.scheduler = scheduler if scheduler is not None else DeadlineScheduler()
+        self._heap = [] #(deadline, sequence number, cursor), only touched by the executor thread
+        self._cursors = {} #maps each playing manager to its cursor, heap entries of other cursors are stale
+        self._sequence = itertools.count() #breaks deadline ties in start order without comparing cursors
+        self._commands = [] #("start", (manager, plan, start time)) and ("stop", manager) in call order, drained by the executor thread
+        self._lock = threading.Lock() #guards _commands and _thread
+        self._wake = threading.Event() #interrupts the executor's wait when a command arrives
+        self._thread = None
+
+    @classmethod
+    def shared(cls):
+        '''Returns the process-wide executor, creating it on first use.'''
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def start(self, manager):
+        '''Starts playing manager from its first action, restarting it if it is already playing. An empty macro only publishes "started" and "stopped".'''
+        plan = manager._compile()
+        manager.running = True
+        self._send(("start", (manager, plan, self.scheduler.now()))) #the cursor is built on the executor thread, after the previous run's "stopped"
+
+    def stop(self, manager):
+        '''Stops manager and releases anything it holds down. Does nothing if it isn't playing.'''
+        manager.running = False
+        self._send(("stop", manager))
+
+    def _send(self, command:tuple):
+        with self._lock:
+            self._commands.append(command)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _finish(self, manager, error:Exception | None = None):
+        cursor = self._cursors.pop(manager, None)
+        if cursor is not None:
+            cursor.finish(error)
+            InputManager.flush()
+
+    def _apply_commands(self):
+        with self._lock:
+            commands, self._commands = self._commands, []
+        for name, target in commands:
+            if name == "start":
+                manager, plan, start = target
+                self._finish(manager)
+                if not len(plan):
+                    manager._publish_empty()
+                    continue
+                manager.running = True #_finish() of the previous run cleared it
+                cursor = PlaybackCursor(manager, plan, start) #resets lateness and telemetry and publishes "started"
+                self._cursors[manager] = cursor
+                heapq.heappush(self._heap, (cursor.deadline(), next(self._sequence), cursor))
+            else:
+                self._finish(target)
+
+    def _loop(self):
+        '''Executor thread: sleeps until the earliest deadline or a command, then steps every due cursor.'''
+        heap = self._heap
+        scheduler = self.scheduler
+        while True:
+            self._wake.clear() #cleared before draining, so a command sent after this point always wakes the wait below
+            self._apply_commands()
+            while heap and self._cursors.get(heap[0][2].manager) is not heap[0][2]: #drop entries of stopped or restarted cursors
+                heapq.heappop(heap)
+            if not heap:
+                self._wake.wait()
+                continue
+            if heap[0][0] > scheduler.now(): #nothing else is due this tick, so submit what a batching backend queued
+                InputManager.flush()
+            if scheduler.wait_until(heap[0][0], self._wake) is None: #a command arrived while waiting
+                continue
+            now = scheduler.now()
+            while heap and heap[0][0] <= now:
+                deadline, _, cursor = heapq.heappop(heap)
+                manager = cursor.manager
+                if self._cursors.get(manager) is not cursor:
+                    continue
+                if not manager.running: #running was cleared without stop()
+                    self._finish(manager)
+                    continue
+                error = None
+                try:
+                    next_deadline = cursor.step(now - deadline)
+                except Exception as e: #one failing macro must not stop the others
+                    print(f'Macro playback failed: {e}')
+                    error = e
+                    next_deadline = None
+                if next_deadline is None:
+                    self._finish(manager, error)
+                else:
+                    heapq.heappush(heap, (next_deadline, next(self._sequence), cursor))
\ No newline at end of file
@@ -0,0 +1,92 @@
+from .action_store import ActionStore
+from typing import Iterable
+
+#Passes that shrink a sorted ActionStore in place without changing what playback does to the OS, apart from injecting fewer events
+#Each pass returns how many injected events it saved
+
+_KEY_DOWN, _KEY_UP, _MOUSE_DOWN, _MOUSE_UP, _MOUSE_MOVE = (ActionStore.TYPE_CODES[type] for type in ("key_down", "key_up", "mouse_down", "mouse_up", "mouse_move"))
+_DOWNS = {_KEY_DOWN: _KEY_UP, _MOUSE_DOWN: _MOUSE_UP} #down code -> matching up code
+_UPS = {_KEY_UP: _KEY_DOWN, _MOUSE_UP: _MOUSE_DOWN}
+
+def merge_same_timestamp(store:ActionStore) -> int:
+    '''Removes actions identical to the action right before them at the same timestamp, and all but the last of consecutive mouse_moves sharing one. Actions that aren't adjacent are never merged, so [down, up, down] keeps the key held and the cursor ends where the last move puts it.'''
+    keep = [True] * len(store)
+    types, inputs, timestamps, xs, ys = store.types, store.inputs, store.timestamps, store.xs, store.ys
+    for index in range(1, len(store)):
+        previous = index - 1
+        if timestamps[index] != timestamps[previous]:
+            continue
+        if types[index] == _MOUSE_MOVE and types[previous] == _MOUSE_MOVE:
+            keep[previous] = False #only the last of the run decides where the cursor ends
+        elif (types[index], inputs[index], xs[index], ys[index]) == (types[previous], inputs[previous], xs[previous], ys[previous]):
+            keep[index] = False
+    return store.compress(keep)
+
+def collapse_auto_repeat(store:ActionStore) -> int:
+    '''Removes key_downs of keys that are already held, which is how OS auto-repeat shows up in recordings.'''
+    keep = [True] * len(store)
+    held = set()
+    for index, (type, input_id) in enumerate(zip(store.types, store.inputs)):
+        if type == _KEY_DOWN:
+            if input_id in held:
+                keep[index] = False
+            held.add(input_id)
+        elif type == _KEY_UP:
+            held.discard(input_id)
+    return store.compress(keep)
+
+def _unbalanced(store:ActionStore, held:set) -> list[bool]:
+    '''Walks store starting with the (down code, input id) pairs in held, which it updates, and returns which actions balance_pairs() may keep.'''
+    keep = [True] * len(store)
+    for index, (type, input_id) in enumerate(zip(store.types, store.inputs)):
+        if type in _DOWNS:
+            if type == _MOUSE_DOWN and (type, input_id) in held:
+                keep[index] = False
+            held.add((type, input_id))
+        elif type in _UPS:
+            pair = (_UPS[type], input_id)
+            if pair in held:
+                held.remove(pair)
+            else:
+                keep[index] = False
+    return keep
+
+def balance_pairs(store:ActionStore) -> int:
+    '''Removes ups of inputs that aren't held and repeated mouse_downs of held buttons. Inputs still held at the end are left to playback, which releases them when it stops. An action that only balances inputs held at the end, i.e. in the next iteration of a looping macro, is kept.'''
+    held = set() #(down code, input id)
+    first = _unbalanced(store, held)
+    looped = _unbalanced(store, held) #held now holds what the end of the macro leaves held
+    return store.compress([kept or kept_looped for kept, kept_looped in zip(first, looped)])
+
+def elide_redundant_moves(store:ActionStore) -> int:
+    '''Removes mouse_moves to where the macro already put the cursor. Clicks always keep their location, so they land where they were recorded even if the real cursor was moved in between.'''
+    keep = [True] * len(store)
+    position = None #where the macro last put the cursor
+    for index, type in enumerate(store.types):
+        if type not in (_MOUSE_MOVE, _MOUSE_DOWN, _MOUSE_UP):
+            continue
+        x = store.xs[index]
+        if x == ActionStore.NO_LOCATION:
+            continue
+        location = (x, store.ys[index])
+        if type == _MOUSE_MOVE and location == position:
+            keep[index] = False
+        position = location
+    return store.compress(keep)
+
+PASSES = {
+    "merge_same_timestamp": merge_same_timestamp,
+    "collapse_auto_repeat": collapse_auto_repeat,
+    "balance_pairs": balance_pairs,
+    "elide_redundant_moves": elide_redundant_moves,
+} #in the order optimize() runs them
+
+def optimize(store:ActionStore, passes:Iterable[str] | None = None) -> dict[str, int]:
+    '''Sorts store, then runs the named passes (all of PASSES by default) in PASSES order and returns how many injected events each one saved.'''
+    passes = set(PASSES) if passes is None else set(passes)
+    for name in passes:
+        if name not in PASSES:
+            raise ValueError(f'Invalid optimizer pass: {name}')
+    names = [name for name in PASSES if name in passes]
+    store.sort()
+    return {name: PASSES[name](store) for name in names}
\ No newline at end of file
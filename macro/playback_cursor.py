@@ -0,0 +1,180 @@
+from .action import Action
+from .playback_plan import PlaybackPlan
+from .idle_gap_compressor import IdleGapCompressor
+from .playback_events import PlaybackEvent
+from array import array
+from time import perf_counter
+from typing import Callable, Iterable
+
+class PlaybackCursor:
+    '''Class holding one playback's position in a compiled plan. step() fires the due action and returns the next deadline, so a single thread can drive any number of cursors.'''
+
+    __slots__ = ("manager", "plan", "index", "start", "loop")
+
+    MAX_CATCH_UP = 1.0 #seconds an iteration may start behind schedule before the timeline is re-based instead of replaying missed iterations
+
+    def __init__(self, manager, plan:PlaybackPlan, start:float):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param manager: the ActionManager being played, its looping flag is read at the end of every iteration.
+        :type manager: ActionManager
+        :param plan: compiled, non-empty plan of manager.save.
+        :type plan: PlaybackPlan
+        :param start: clock time the first iteration starts at.
+        :type start: float
+        '''
+        self.manager = manager
+        self.plan = plan
+        self.index = 0
+        self.start = start
+        self.loop = 0 #iteration being played, counting from 0
+        self._begin(len(plan), plan.duration)
+
+    def _begin(self, actions:int, duration:float | None):
+        '''Resets the manager's lateness and telemetry for a playback of this many actions and publishes "started".'''
+        manager = self.manager
+        manager.lateness = array("d", bytes(8 * actions))
+        if manager.telemetry is not None:
+            manager.telemetry.start_playback(actions)
+        if manager._listeners:
+            manager._publish(PlaybackEvent("started", offset=duration))
+
+    def deadline(self) -> float:
+        '''Returns the clock time the action at the cursor is due.'''
+        return self.start + self.plan.offsets[self.index]
+
+    def _fire(self, index:int, call, input, down:bool, offset:float, lateness:float):
+        '''Injects one action through call, records how late it was and publishes "action".'''
+        manager = self.manager
+        if index < len(manager.lateness):
+            manager.lateness[index] = lateness
+        else: #streamed playback learns its length as it goes
+            manager.lateness.append(lateness)
+        telemetry = manager.telemetry
+        if telemetry is None:
+            call()
+        else:
+            began = perf_counter()
+            call()
+            telemetry.record(index, lateness, perf_counter() - began)
+        if down:
+            manager._downed.add(input)
+        else:
+            manager._downed.discard(input)
+        if manager._listeners: #events are only built when someone listens
+            manager._publish(PlaybackEvent("action", index=index, loop=self.loop, offset=offset, lateness=lateness))
+
+    def _next_loop(self, now:float, duration:float, first_offset:float):
+        '''Moves start one iteration of duration seconds on, or to now if playback fell more than duration or MAX_CATCH_UP behind, and publishes "loop".'''
+        self.start += duration
+        if now - self.start - first_offset > min(duration, PlaybackCursor.MAX_CATCH_UP): #stalled, e.g. by a suspended process
+            self.start = now - first_offset
+        self.loop += 1
+        if self.manager._listeners:
+            self.manager._publish(PlaybackEvent("loop", loop=self.loop))
+
+    def step(self, lateness:float) -> float | None:
+        '''Fires the action at the cursor, records how late it was and advances. Returns the next deadline, or None when playback is over. Iteration k of a looping macro starts exactly k plan durations after the first, so loops don't drift, unless playback fell more than a plan duration or MAX_CATCH_UP behind: then the next iteration starts now and the missed ones are skipped rather than replayed in one burst.'''
+        plan = self.plan
+        index = self.index
+        self._fire(index, plan.calls[index], plan.inputs[index], plan.releases[index] is not None, plan.offsets[index], lateness)
+        if index == len(plan) - 1:
+            if not self.manager.looping:
+                return None
+            self.index = 0
+            self._next_loop(self.start + plan.offsets[index] + lateness, plan.duration, plan.offsets[0])
+        else:
+            self.index = index + 1
+        return self.deadline()
+
+    def finish(self, error:Exception | None = None):
+        '''Releases whatever playback left held down, marks the manager as stopped and publishes error, if any, then "stopped".'''
+        manager = self.manager
+        try:
+            manager._resolve_downed()
+        finally: #still report the stop if a release fails
+            manager.running = False
+            if manager.telemetry is not None:
+                manager.telemetry.end_playback()
+            if manager._listeners:
+                if error is not None:
+                    manager._publish(PlaybackEvent("error", loop=self.loop, error=error))
+                manager._publish(PlaybackEvent("stopped", loop=self.loop))
+
+class StreamCursor(PlaybackCursor):
+    '''PlaybackCursor over the actions source() yields instead of a compiled plan, so playback starts before the macro is fully loaded, see ActionManager.start_stream(). Actions must come in timestamp order. Every iteration calls source() again and compiles each action as it is reached.'''
+
+    __slots__ = ("source", "actions", "compress", "speed", "call", "input", "down", "offset")
+
+    def __init__(self, manager, source:Callable[[], Iterable[Action]], start:float):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param manager: the ActionManager being played, its speed and max_idle_gap are read at the start of every iteration.
+        :type manager: ActionManager
+        :param source: returns a new iterable of the macro's actions for each iteration.
+        :type source: Callable[[], Iterable[Action]]
+        :param start: clock time the first iteration starts at.
+        :type start: float
+        '''
+        self.manager = manager
+        self.plan = None
+        self.index = 0
+        self.start = start
+        self.loop = 0
+        self.source = source
+        self.actions = None #iterator of the current iteration
+        self._begin(0, None) #the length and duration are unknown until the stream ends
+
+    def open(self) -> float | None:
+        '''Starts the first iteration. Returns the first deadline, or None if source() yields no actions.'''
+        return self.deadline() if self._open() else None
+
+    def _open(self) -> bool:
+        '''Calls source() for a new iteration and reads its first action. Returns False if it yields none.'''
+        self.close()
+        manager = self.manager
+        self.compress = IdleGapCompressor(manager.max_idle_gap)
+        self.speed = manager.speed
+        self.actions = iter(self.source())
+        self.index = -1
+        return self._advance()
+
+    def _advance(self) -> bool:
+        '''Reads and compiles the next action of the iteration. Returns False at its end.'''
+        action = next(self.actions, None)
+        if action is None:
+            return False
+        self.index += 1
+        self.offset = self.compress(action.type, action.input, action.timestamp) / self.speed
+        self.call, release = PlaybackPlan.compile_action(action.type, action.input, action.location)
+        self.input = action.input
+        self.down = release is not None
+        return True
+
+    def deadline(self) -> float:
+        return self.start + self.offset
+
+    def step(self, lateness:float) -> float | None:
+        '''Like PlaybackCursor.step(), with the duration of an iteration being the offset of its last action.'''
+        offset = self.offset
+        self._fire(self.index, self.call, self.input, self.down, offset, lateness)
+        if self._advance():
+            return self.deadline()
+        if not self.manager.looping or not self._open():
+            return None
+        self._next_loop(self.start + offset + lateness, max(offset, PlaybackPlan.MIN_DURATION), self.offset)
+        return self.deadline()
+
+    def close(self):
+        '''Closes the current iteration's iterator, which stops generators reading from files early.'''
+        if hasattr(self.actions, "close"):
+            self.actions.close()
+        self.actions = None
+
+    def finish(self, error:Exception | None = None):
+        self.close()
+        super().finish(error)
\ No newline at end of file
@@ -0,0 +1,34 @@
+class PlaybackEvent:
+    '''Class describing one step of a playback: "started", "action" after each action fires, "loop" when a looping macro starts another iteration, "error" when playback fails, and "stopped", which always comes last.'''
+
+    __slots__ = ("kind", "index", "loop", "offset", "lateness", "error")
+
+    KINDS = ("started", "action", "loop", "error", "stopped")
+
+    def __init__(self, kind:str, index:int | None = None, loop:int = 0, offset:float | None = None, lateness:float | None = None, error:Exception | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param kind: one of KINDS.
+        :type kind: str
+        :param index: index into the macro's actions of the fired action, None for other kinds.
+        :type index: int | None
+        :param loop: iteration the event belongs to, counting from 0.
+        :type loop: int
+        :param offset: seconds into the iteration the action was scheduled at, or the plan duration for "started". None otherwise.
+        :type offset: float | None
+        :param lateness: seconds the action fired after its scheduled time, None for other kinds.
+        :type lateness: float | None
+        :param error: the exception that ended playback, for "error" only.
+        :type error: Exception | None
+        '''
+        self.kind = kind
+        self.index = index
+        self.loop = loop
+        self.offset = offset
+        self.lateness = lateness
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f'PlaybackEvent({self.kind!r}, index={self.index}, loop={self.loop}, offset={self.offset}, lateness={self.lateness}, error={self.error!r})'
\ No newline at end of file
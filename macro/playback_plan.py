@@ -0,0 +1,75 @@
+from .action_store import ActionStore
+from .input_manager import InputManager
+from .idle_gap_compressor import IdleGapCompressor
+from array import array
+from functools import partial
+
+class PlaybackPlan:
+    '''Immutable, precompiled form of a macro for playback: a flat array of offsets with one pre-bound injector call per action.'''
+
+    __slots__ = ("offsets", "calls", "inputs", "releases", "duration")
+
+    MIN_DURATION = 0.001 #shortest loop length in seconds, keeps a macro whose actions all share one timestamp from flooding the OS when looping
+
+    def __init__(self, store:ActionStore, speed:float = 1.0, max_idle_gap:float | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param store: actions to compile, must be sorted by timestamp.
+        :type store: ActionStore
+        :param speed: playback speed multiplier, offsets are divided by it.
+        :type speed: float
+        :param max_idle_gap: idle gaps longer than this many recorded seconds are cut to it, see IdleGapCompressor. None keeps every gap.
+        :type max_idle_gap: float | None
+        '''
+        if speed <= 0:
+            raise ValueError("Invalid speed: must be positive.")
+        compress = IdleGapCompressor(max_idle_gap)
+        offsets = []
+        calls = []
+        inputs = []
+        releases = [] #release call for down events, None for up events
+        shared_releases = {} #one release partial per distinct input
+        for index in range(len(store)):
+            type = store.type_at(index)
+            input = store.input_at(index)
+            offsets.append(compress(type, input, store.timestamps[index]) / speed)
+            call, release = PlaybackPlan.compile_action(type, input, store.location_at(index))
+            calls.append(call)
+            inputs.append(input)
+            if release is not None:
+                release = shared_releases.setdefault(input, release)
+            releases.append(release)
+
+        self.offsets = array("d", offsets) #seconds from the start of an iteration, treat as read only
+        self.calls = tuple(calls)
+        self.inputs = tuple(inputs)
+        self.releases = tuple(releases)
+        self.duration = max(self.offsets[-1], PlaybackPlan.MIN_DURATION) if self.offsets else 0.0 #length of one iteration when looping
+
+    @staticmethod
+    def compile_action(type:str, input, location:tuple[int, int] | None) -> tuple[partial, partial | None]:
+        '''Returns the pre-bound call injecting one action, and for down events the call that releases its input (None for up events).'''
+        match type:
+            case "key_down":
+                return partial(InputManager.key_down, input), partial(InputManager.key_up, input)
+            case "key_up":
+                return partial(InputManager.key_up, input), None
+            case "mouse_down":
+                if location is None:
+                    return partial(InputManager.mouse_down, input), partial(InputManager.mouse_up, input)
+                return partial(InputManager.mouse_down_at, input, location[0], location[1]), partial(InputManager.mouse_up, input)
+            case "mouse_up":
+                if location is None:
+                    return partial(InputManager.mouse_up, input), None
+                return partial(InputManager.mouse_up_at, input, location[0], location[1]), None
+            case "mouse_move":
+                if location is None:
+                    raise ValueError("mouse_move needs a location.")
+                return partial(InputManager.move_cursor, location[0], location[1]), None
+            case _:
+                raise ValueError("Invalid type.")
+
+    def __len__(self) -> int:
+        return len(self.calls)
\ No newline at end of file
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import time
+from array import array
+
+class LatencyHistogram:
+    '''HDR-style histogram of durations: exact below 32 µs, then 16 log-linear buckets per power of two (about 6% relative error) up to about 2^41 µs. Recording is O(1) and memory fixed.'''
+
+    SUB_BITS = 5 #values below 2**SUB_BITS µs get a bucket each
+    HALF = 1 << (SUB_BITS - 1) #buckets per power of two above that
+    MAX_SHIFT = 36 #values above ~2^41 µs (25 days) land in the last bucket
+    SIZE = (1 << SUB_BITS) + MAX_SHIFT * HALF
+
+    def __init__(self):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        '''
+        self.counts = array("Q", bytes(8 * LatencyHistogram.SIZE))
+        self.count = 0
+        self.total = 0.0 #sum of recorded seconds
+        self.max = 0.0 #largest recorded seconds
+
+    @staticmethod
+    def _index(micros:int) -> int:
+        if micros < (1 << LatencyHistogram.SUB_BITS):
+            return micros
+        shift = micros.bit_length() - LatencyHistogram.SUB_BITS
+        if shift > LatencyHistogram.MAX_SHIFT:
+            return LatencyHistogram.SIZE - 1
+        return (1 << LatencyHistogram.SUB_BITS) + (shift - 1) * LatencyHistogram.HALF + (micros >> shift) - LatencyHistogram.HALF
+
+    @staticmethod
+    def upper_bound(index:int) -> float:
+        '''Returns the largest value in seconds that falls into bucket index.'''
+        if index < (1 << LatencyHistogram.SUB_BITS):
+            return index * 1e-6
+        shift, offset = divmod(index - (1 << LatencyHistogram.SUB_BITS), LatencyHistogram.HALF)
+        shift += 1
+        return (((LatencyHistogram.HALF + offset + 1) << shift) - 1) * 1e-6
+
+    def record(self, seconds:float):
+        '''Records one duration, negative values count as 0.'''
+        if seconds < 0:
+            seconds = 0.0
+        self.counts[LatencyHistogram._index(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, share:float) -> float:
+        '''Returns the upper bound in seconds of the bucket holding the given share (0.0 to 1.0) of recorded values, capped at max.'''
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(share * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(LatencyHistogram.upper_bound(index), self.max)
+        return self.max
+
+    def count_at_or_below(self, seconds:float) -> int:
+        '''Returns how many recorded values fall into buckets entirely at or below seconds, for cumulative exports.'''
+        below = 0
+        for index, count in enumerate(self.counts):
+            if LatencyHistogram.upper_bound(index) > seconds:
+                break
+            below += count
+        return below
+
+    def to_dict(self) -> dict:
+        '''Returns summary statistics and the non-empty buckets as {upper bound in seconds: count}.'''
+        return {
+            "count": self.count,
+            "mean_s": self.mean(),
+            "p50_s": self.percentile(0.5),
+            "p99_s": self.percentile(0.99),
+            "p999_s": self.percentile(0.999),
+            "max_s": self.max,
+            "buckets": {repr(LatencyHistogram.upper_bound(index)): count for index, count in enumerate(self.counts) if count},
+        }
+
+class PlaybackTelemetry:
+    '''Class collecting timing statistics of an ActionManager's playbacks: lateness of every action, time spent injecting it, jitter between consecutive actions and drift of loop starts. Attach with manager.telemetry = PlaybackTelemetry(), when it is None playback only pays one attribute check per action.'''
+
+    EXPORT_BOUNDS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.5, 1.0) #histogram bucket bounds in seconds for Prometheus
+    WORST_ACTIONS = 10 #actions with the worst lateness listed by to_dict()
+
+    def __init__(self):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        '''
+        self.reset()
+
+    def reset(self):
+        '''Clears everything recorded so far.'''
+        self.lateness = LatencyHistogram() #scheduled to actual fire time
+        self.activate = LatencyHistogram() #time spent in the InputManager call of each action
+        self.max_lateness = array("d") #per action index, the worst lateness seen
+        self.max_jitter = 0.0 #largest change in lateness between consecutive actions
+        self.loops = 0 #iterations started
+        self.loop_drift = 0.0 #lateness of the latest iteration's first action minus that of the first iteration
+        self.max_loop_drift = 0.0
+        self._previous = None #lateness of the previous action
+        self._first_start = None #lateness of the first action of the first iteration
+
+    def record(self, index:int, lateness:float, activate:float):
+        '''Records one fired action. Called by playback after each action.'''
+        self.lateness.record(lateness)
+        self.activate.record(activate)
+        worst = self.max_lateness
+        if index >= len(worst): #streamed playback doesn't know its length up front
+            worst.extend(array("d", bytes(8 * (index + 1 - len(worst)))))
+        if lateness > worst[index]:
+            worst[index] = lateness
+        if self._previous is not None:
+            jitter = abs(lateness - self._previous)
+            if jitter > self.max_jitter:
+                self.max_jitter = jitter
+        self._previous = lateness
+        if index == 0:
+            self.loops += 1
+            if self._first_start is None:
+                self._first_start = lateness
+            else:
+                self.loop_drift = lateness - self._first_start
+                if abs(self.loop_drift) > abs(self.max_loop_drift):
+                    self.max_loop_drift = self.loop_drift
+
+    def start_playback(self, actions:int):
+        '''Called when a playback of a plan with this many actions starts, sizing the per action statistics once.'''
+        if actions > len(self.max_lateness):
+            self.max_lateness.extend(array("d", bytes(8 * (actions - len(self.max_lateness)))))
+
+    def end_playback(self):
+        '''Called when a playback stops, so the next one isn't compared with this one's last action.'''
+        self._previous = None
+        self._first_start = None
+
+    def to_dict(self) -> dict:
+        worst = sorted(range(len(self.max_lateness)), key=self.max_lateness.__getitem__, reverse=True)[:PlaybackTelemetry.WORST_ACTIONS]
+        return {
+            "lateness": self.lateness.to_dict(),
+            "activate": self.activate.to_dict(),
+            "max_jitter_s": self.max_jitter,
+            "loops": self.loops,
+            "loop_drift_s": self.loop_drift,
+            "max_loop_drift_s": self.max_loop_drift,
+            "worst_actions": [{"index": index, "max_lateness_s": self.max_lateness[index]} for index in worst],
+        }
+
+    def save_json(self, file_path:str):
+        '''Writes to_dict() and the export time to a JSON file.'''
+        with open(file_path, 'w') as file:
+            json.dump({"created": time.time(), **self.to_dict()}, file, indent=4)
+
+    def to_prometheus(self, prefix:str = "macro_playback", labels:dict | None = None) -> str:
+        '''Returns the statistics in the Prometheus text exposition format, histograms with EXPORT_BOUNDS as buckets.'''
+        label_text = ",".join(f'{key}="{value}"' for key, value in (labels or {}).items())
+        def series(name:str, extra:str = "") -> str:
+            inner = ",".join(part for part in (label_text, extra) if part)
+            return f'{prefix}_{name}{{{inner}}}' if inner else f'{prefix}_{name}'
+        lines = []
+        for name, histogram, help_text in (("lateness_seconds", self.lateness, "Seconds actions fired after their scheduled time."), ("activate_seconds", self.activate, "Seconds spent injecting each action.")):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} histogram')
+            for bound in PlaybackTelemetry.EXPORT_BOUNDS:
+                le = f'le="{bound}"'
+                lines.append(f'{series(name + "_bucket", le)} {histogram.count_at_or_below(bound)}')
+            le = 'le="+Inf"'
+            lines.append(f'{series(name + "_bucket", le)} {histogram.count}')
+            lines.append(f'{series(name + "_sum")} {histogram.total}')
+            lines.append(f'{series(name + "_count")} {histogram.count}')
+        for name, value, help_text in (("max_jitter_seconds", self.max_jitter, "Largest change in lateness between consecutive actions."), ("loop_drift_seconds", self.loop_drift, "Lateness of the latest loop start minus the first."), ("loops_total", self.loops, "Iterations started.")):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {"counter" if name.endswith("_total") else "gauge"}')
+            lines.append(f'{series(name)} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(self, file_path:str, prefix:str = "macro_playback", labels:dict | None = None):
+        '''Writes to_prometheus() for node_exporter's textfile collector, replacing the file atomically so it is never read half written.'''
+        temp_path = f'{file_path}.tmp'
+        with open(temp_path, 'w') as file:
+            file.write(self.to_prometheus(prefix, labels))
+        os.replace(temp_path, file_path)
\ No newline at end of file
@@ -0,0 +1,66 @@
+import sys
+import time
+import threading
+
+class DeadlineScheduler:
+    '''Class that waits for absolute deadlines: a coarse interruptible sleep until shortly before the deadline, then a precise finish.'''
+
+    #margin is how many seconds before the deadline the coarse sleep ends, finish is how the remaining time is waited out
+    #"sleep" finishes with time.sleep (high resolution timer on Windows since Python 3.11), "spin" busy waits on perf_counter
+    PROFILES = {
+        "power": {"margin": 0.0, "finish": "sleep"}, #fewest wakeups, lateness bounded by OS sleep granularity
+        "balanced": {"margin": 0.002, "finish": "sleep"},
+        "precision": {"margin": 0.016 if sys.platform == "win32" else 0.002, "finish": "spin"}, #burns one core for the last margin
+    }
+    DEFAULT_PROFILE = "balanced"
+
+    def __init__(self, profile:str = DEFAULT_PROFILE, margin:float | None = None, finish:str | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param profile: key of PROFILES supplying default margin and finish.
+        :type profile: str
+        :param margin: overrides the profile's margin in seconds.
+        :type margin: float | None
+        :param finish: overrides the profile's finish, "sleep" or "spin".
+        :type finish: str | None
+        '''
+        if profile not in DeadlineScheduler.PROFILES:
+            raise ValueError(f'Invalid scheduler profile: {profile}')
+        settings = DeadlineScheduler.PROFILES[profile]
+        self.profile = profile
+        self.margin = settings["margin"] if margin is None else margin
+        self.finish = settings["finish"] if finish is None else finish
+        if self.margin < 0:
+            raise ValueError("Invalid margin: negative.")
+        if self.finish not in ("sleep", "spin"):
+            raise ValueError(f'Invalid finish: {self.finish}')
+
+    @staticmethod
+    def now() -> float:
+        '''Returns the scheduler's current time in seconds.'''
+        return time.perf_counter()
+
+    def wait_until(self, deadline:float, stop_event:threading.Event | None = None) -> float | None:
+        '''Blocks until deadline (in now() time), then returns how many seconds late it woke up. Returns None if stop_event was set while waiting.'''
+        coarse = deadline - self.now() - self.margin
+        if coarse > 0:
+            if stop_event is not None:
+                if stop_event.wait(coarse):
+                    return None
+            else:
+                time.sleep(coarse)
+
+        if self.finish == "spin":
+            while self.now() < deadline:
+                pass
+        else:
+            remaining = deadline - self.now()
+            while remaining > 0: #sleep can return marginally early, so loop until the deadline has really passed
+                time.sleep(remaining)
+                remaining = deadline - self.now()
+
+        if stop_event is not None and stop_event.is_set():
+            return None
+        return self.now() - deadline
\ No newline at end of file
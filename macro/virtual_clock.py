@@ -0,0 +1,75 @@
+from .input_backends import RecordingBackend
+from .input_manager import InputManager
+from .input_conversion import input_to_str
+import threading
+from typing import Callable, Iterable
+
+class VirtualClock:
+    '''Drop-in for DeadlineScheduler whose time only moves when playback waits, so a macro runs as fast as the CPU allows.'''
+
+    def __init__(self, start:float = 0.0, stop_at:float | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param start: virtual time in seconds the clock starts at.
+        :type start: float
+        :param stop_at: virtual time at which waiting playback is stopped, like calling stop() then. None never stops.
+        :type stop_at: float | None
+        '''
+        self.time = start
+        self.stop_at = stop_at
+
+    def now(self) -> float:
+        return self.time
+
+    def wait_until(self, deadline:float, stop_event:threading.Event | None = None) -> float | None:
+        '''Jumps the clock to deadline and returns 0.0. Returns None if stop_event is set or deadline lies past stop_at, leaving the clock at stop_at.'''
+        if stop_event is not None and stop_event.is_set():
+            return None
+        if self.stop_at is not None and deadline > self.stop_at:
+            self.time = max(self.time, self.stop_at)
+            return None
+        if deadline > self.time:
+            self.time = deadline
+        return self.time - deadline
+
+    def simulate(self, manager, until:float | None = None, source:Callable[[], Iterable] | None = None) -> list[tuple[float, str, tuple]]:
+        '''
+        Runs manager's macro to completion on this clock, in the calling thread, and returns every injected event as (virtual time, InputManager method, args).
+
+        :param manager: the ActionManager to run. Its scheduler and the InputManager backend are restored afterwards.
+        :type manager: ActionManager
+        :param until: virtual seconds after the current time to stop at, required when manager is looping.
+        :type until: float | None
+        :param source: if set, plays the actions it returns like start_stream(source) instead of manager's macro.
+        :type source: Callable[[], Iterable[Action]] | None
+        '''
+        if until is None and manager.looping:
+            raise ValueError("Looping macros need a virtual stop time.")
+        backend = RecordingBackend(clock=self.now)
+        previous_backend = InputManager.set_backend(backend)
+        previous_scheduler = manager.scheduler
+        previous_stop = self.stop_at
+        manager.scheduler = self
+        if until is not None:
+            self.stop_at = self.time + until
+        try:
+            if source is None:
+                manager._run()
+            else:
+                manager._run_stream(source)
+        finally:
+            manager.scheduler = previous_scheduler
+            self.stop_at = previous_stop
+            InputManager.set_backend(previous_backend)
+        return backend.events
+
+    @staticmethod
+    def trace_lines(events:list[tuple[float, str, tuple]]) -> list[str]:
+        '''Formats simulated events as one readable line each, e.g. for difflib comparisons between versions of a macro.'''
+        lines = []
+        for time, name, args in events:
+            args = ", ".join(str(arg) if isinstance(arg, int) else str(input_to_str(arg)) for arg in args)
+            lines.append(f'{time:.6f} {name}({args})')
+        return lines
\ No newline at end of file
@@ -1,4 +1,5 @@
 '''This module contains the ActionRecorder class that manages the record feature.'''
 
 from .action_recorder import ActionRecorder
-__all__ = ["ActionRecorder"]
\ No newline at end of file
+from .path_simplifier import MoveSamplingPolicy, simplify_path, fill_time_gaps
+__all__ = ["ActionRecorder", "MoveSamplingPolicy", "simplify_path", "fill_time_gaps"]
\ No newline at end of file
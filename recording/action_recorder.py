@@ -1,27 +1,57 @@
-from macro import Action
+from macro import Action, ActionStore
+from .path_simplifier import MoveSamplingPolicy, simplify_path, fill_time_gaps
 from pynput import mouse, keyboard
+from collections import deque
+import heapq
+from operator import itemgetter
 import threading
 import time
 
+KEY_DOWN, KEY_UP, MOUSE_DOWN, MOUSE_UP, MOUSE_MOVE = (ActionStore.TYPE_CODES[type] for type in ("key_down", "key_up", "mouse_down", "mouse_up", "mouse_move"))
+
 class ActionRecorder:
     '''Class that tracks user inputs and translates them into Action objects.'''
 
-    def __init__(self):
-        self._lock = threading.Lock()
+    def __init__(self, record_moves:bool = False, move_policy:MoveSamplingPolicy | None = None):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param record_moves: if True, recording sessions also record mouse movement as mouse_move actions.
+        :type record_moves: bool
+        :param move_policy: sampling and simplification settings for mouse movement. None uses the defaults.
+        :type move_policy: MoveSamplingPolicy | None
+        '''
+        self.record_moves = record_moves
+        self.move_policy = move_policy if move_policy is not None else MoveSamplingPolicy()
+        self._last_move = (0, 0, 0) #(ns timestamp, x, y) of the last recorded movement
+        self._skipped_move = None #raw event of the latest movement the throttle dropped, recorded if it turns out to end a path
+
         self.stop_event = threading.Event()
-        self._recorded_actions = []
-        self._start_time = None #set whenever record is hit
+        #listener callbacks only append raw (ns timestamp, type code, input, x, y) tuples, one buffer per listener thread
+        #deque.append is atomic, so no lock is taken on the OS hook path. Conversion happens in retrieve_record()
+        self._mouse_events = deque()
+        self._keyboard_events = deque()
+        self._start_time = None #perf_counter_ns() value, set whenever record is hit
 
         self._recorder_thread = threading.Thread(target=self._record, daemon=True)
 
     def _record(self) -> list[Action]:
         '''Starts a recording session that tracks and stores keyboard and mouse inputs until stop is called.'''
-        self._recorded_actions.clear()
+        self._mouse_events.clear()
+        self._keyboard_events.clear()
         
-        self.mouse_listener = mouse.Listener(on_click=self._on_click)
+        self._last_move = (0, 0, 0)
+        self._skipped_move = None
+        self._move_interval_ns = int(self.move_policy.min_interval * 1e9) #read once so the callback doesn't follow attribute chains
+        self._move_distance = self.move_policy.min_distance
+        if self.record_moves:
+            self.mouse_listener = mouse.Listener(on_click=self._on_click, on_move=self._on_move)
+        else:
+            self.mouse_listener = mouse.Listener(on_click=self._on_click)
         self.keyboard_listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
 
-        self._start_time = time.perf_counter()
+        self._start_time = time.perf_counter_ns()
 
         self.mouse_listener.start()
         self.keyboard_listener.start()
@@ -31,33 +61,37 @@ class ActionRecorder:
         self.stop_event.clear()
 
     def _on_click(self, x, y, button, pressed):
-        with self._lock:
-            if self.stop_event.is_set():
-                return False
-            location = (x, y)
-            if pressed:
-                type = "mouse_down"
-            else:
-                type = "mouse_up"
-            timestamp = time.perf_counter() - self._start_time
-            action = Action(type=type, input=button, timestamp=timestamp, location=location)
-            self._recorded_actions.append(action)
+        if self.stop_event.is_set():
+            return False
+        if self._skipped_move is not None: #the cursor must be where it really was before the click
+            self._mouse_events.append(self._skipped_move)
+            self._skipped_move = None
+        self._mouse_events.append((time.perf_counter_ns(), MOUSE_DOWN if pressed else MOUSE_UP, button, x, y))
     
+    def _on_move(self, x, y):
+        if self.stop_event.is_set():
+            return False
+        now = time.perf_counter_ns()
+        last_time, last_x, last_y = self._last_move
+        if now - last_time < self._move_interval_ns or (abs(x - last_x) < self._move_distance and abs(y - last_y) < self._move_distance):
+            self._skipped_move = (now, MOUSE_MOVE, None, x, y)
+            return
+        skipped = self._skipped_move
+        if skipped is not None and now - skipped[0] >= self._move_interval_ns: #the cursor rested there, so it ended the previous path
+            self._mouse_events.append(skipped)
+        self._skipped_move = None
+        self._last_move = (now, x, y)
+        self._mouse_events.append((now, MOUSE_MOVE, None, x, y))
+
     def _on_press(self, key):
-        with self._lock:
-            if self.stop_event.is_set():
-                return False
-            timestamp = time.perf_counter() - self._start_time
-            action = Action(type="key_down", input=key, timestamp=timestamp, location=None)
-            self._recorded_actions.append(action)
+        if self.stop_event.is_set():
+            return False
+        self._keyboard_events.append((time.perf_counter_ns(), KEY_DOWN, key, None, None))
     
     def _on_release(self, key):
-        with self._lock:
-            if self.stop_event.is_set():
-                return False
-            timestamp = time.perf_counter() - self._start_time
-            action = Action(type="key_up", input=key, timestamp=timestamp, location=None)
-            self._recorded_actions.append(action)
+        if self.stop_event.is_set():
+            return False
+        self._keyboard_events.append((time.perf_counter_ns(), KEY_UP, key, None, None))
             
     def start_record(self):
         '''Wrapper for _record to start it in a different thread so that stop can be safely called.'''
@@ -74,8 +108,45 @@ class ActionRecorder:
         self.mouse_listener.stop()
         self.keyboard_listener.stop()
 
-    def retrieve_record(self):
-        return self._recorded_actions
+    def _simplify_moves(self, events:list[tuple]) -> list[tuple]:
+        '''Returns the mouse events with each movement path simplified. Paths are split at clicks and at pauses longer than the policy's pause, and keep a point at least every max_step seconds of movement.'''
+        pause_ns = self.move_policy.pause * 1e9
+        max_step_ns = self.move_policy.max_step * 1e9
+        result = []
+        path = []
+
+        def flush_path():
+            if path:
+                kept = simplify_path([event[3] for event in path], [event[4] for event in path], self.move_policy.tolerance)
+                kept = fill_time_gaps([event[0] for event in path], kept, max_step_ns)
+                result.extend(path[index] for index in kept)
+                path.clear()
+
+        for event in events:
+            if event[1] != MOUSE_MOVE:
+                flush_path()
+                result.append(event)
+                continue
+            if path and event[0] - path[-1][0] > pause_ns:
+                flush_path()
+            path.append(event)
+        flush_path()
+        return result
+
+    def retrieve_record(self) -> ActionStore:
+        '''Converts the raw events of the last recording session into an ActionStore, merging both listeners' buffers in timestamp order. Mouse movement paths are simplified first.'''
+        store = ActionStore()
+        start = self._start_time
+        if start is None: #nothing recorded yet
+            return store
+        types = ActionStore.TYPES
+        mouse_events = list(self._mouse_events)
+        if self._skipped_move is not None: #the recording ended during a movement, keep where it stopped
+            mouse_events.append(self._skipped_move)
+        mouse_events = self._simplify_moves(mouse_events)
+        for timestamp, type_code, input, x, y in heapq.merge(mouse_events, list(self._keyboard_events), key=itemgetter(0)):
+            store.append_values(types[type_code], input, (timestamp - start) / 1e9, None if x is None else (x, y))
+        return store
 
     def capture(self, mode:str = "both") -> Action:
         '''Starts a (separate) recording session and captures the first event detected. Then, returns it as an Action object. Mode dictates which listeners to activate.'''
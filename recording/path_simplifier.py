@@ -0,0 +1,99 @@
+import math
+
+try: #numpy is optional, the pure Python fallback gives the same result, only slower on long paths
+    import numpy as np
+except ImportError:
+    np = None
+
+class MoveSamplingPolicy:
+    '''Class holding the settings for which mouse movements are recorded and how recorded paths are simplified.'''
+
+    def __init__(self, min_interval:float = 0.005, min_distance:int = 1, tolerance:float = 1.0, pause:float = 0.1, max_step:float = 0.05):
+        '''
+        Docstring for __init__
+
+        :param self: self
+        :param min_interval: seconds that must pass after a recorded movement before the next one is recorded.
+        :type min_interval: float
+        :param min_distance: pixels the cursor must move on either axis before a movement is recorded.
+        :type min_distance: int
+        :param tolerance: maximum distance in pixels between a dropped point and the simplified path.
+        :type tolerance: float
+        :param pause: seconds without movement that split a path, so hovers keep their timing.
+        :type pause: float
+        :param max_step: most seconds between two points kept on a simplified path, so playback moves the cursor along the path instead of jumping between distant vertices.
+        :type max_step: float
+        '''
+        if min_interval < 0 or min_distance < 0 or tolerance < 0 or pause <= 0 or max_step <= 0:
+            raise ValueError("Invalid sampling policy: negative value.")
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self.tolerance = tolerance
+        self.pause = pause
+        self.max_step = max_step
+
+def _simplify_numpy(xs:list[int], ys:list[int], tolerance:float) -> list[int]:
+    points = np.column_stack((np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        offsets = points[start + 1:end] - points[start]
+        direction = points[end] - points[start]
+        length = math.hypot(direction[0], direction[1])
+        if length == 0: #closed segment, measure distance to the shared endpoint
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            stack.append((start, middle))
+            stack.append((middle, end))
+    return np.flatnonzero(keep).tolist()
+
+def _simplify_python(xs:list[int], ys:list[int], tolerance:float) -> list[int]:
+    keep = [False] * len(xs)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(xs) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = xs[end] - xs[start], ys[end] - ys[start]
+        length = math.hypot(dx, dy)
+        farthest, farthest_distance = None, -1.0
+        for index in range(start + 1, end):
+            ox, oy = xs[index] - xs[start], ys[index] - ys[start]
+            distance = math.hypot(ox, oy) if length == 0 else abs(dx * oy - dy * ox) / length
+            if distance > farthest_distance:
+                farthest, farthest_distance = index, distance
+        if farthest_distance > tolerance:
+            keep[farthest] = True
+            stack.append((start, farthest))
+            stack.append((farthest, end))
+    return [index for index, kept in enumerate(keep) if kept]
+
+def simplify_path(xs:list[int], ys:list[int], tolerance:float) -> list[int]:
+    '''Ramer-Douglas-Peucker simplification. Returns the sorted indices of the points to keep, always including both endpoints, so that no dropped point is further than tolerance pixels from the kept path.'''
+    if len(xs) <= 2:
+        return list(range(len(xs)))
+    if np is not None:
+        return _simplify_numpy(xs, ys, tolerance)
+    return _simplify_python(xs, ys, tolerance)
+
+def fill_time_gaps(timestamps:list, kept:list[int], max_step:float) -> list[int]:
+    '''Returns the sorted indices in kept plus the points needed so that no two consecutive kept points are more than max_step apart in time, wherever the recorded points allow it. Each added point is the last one still within max_step of the previous kept point.'''
+    if not kept:
+        return kept
+    result = [kept[0]]
+    for end in kept[1:]:
+        for index in range(result[-1] + 1, end):
+            if timestamps[index + 1] - timestamps[result[-1]] > max_step:
+                result.append(index)
+        result.append(end)
+    return result
\ No newline at end of file
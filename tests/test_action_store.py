@@ -0,0 +1,12 @@
+from macro import Action, ActionStore
+from pynput import mouse
+
+def test_float_locations_match_stored_ones():
+    click = Action("mouse_down", mouse.Button.left, 1.0, (10.6, 20.2))
+    store = ActionStore()
+    store.append(click)
+    assert store.location_at(0) == (11, 20)
+    assert click in store
+    assert store.index(click) == store.find_sorted(click) == 0
+    store.remove(click)
+    assert len(store) == 0
\ No newline at end of file
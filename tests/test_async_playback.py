@@ -0,0 +1,30 @@
+import asyncio
+from macro import ActionManager, ActionStore, InputManager, RecordingBackend, str_to_key
+
+def test_due_actions_yield_to_other_tasks():
+    key = str_to_key("a")
+    store = ActionStore()
+    for _ in range(100):
+        store.append_values("key_down", key, 0.0)
+        store.append_values("key_up", key, 0.0)
+    manager = ActionManager(store)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(len(backend.events))
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.create_task(ticker())
+        await manager.play()
+        task.cancel()
+
+    backend = RecordingBackend()
+    previous = InputManager.set_backend(backend)
+    try:
+        asyncio.run(main())
+    finally:
+        InputManager.set_backend(previous)
+    assert len(backend.events) == 200
+    assert len(ticks) > 100 #the ticker ran between actions, not only before and after playback
\ No newline at end of file
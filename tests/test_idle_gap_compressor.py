@@ -0,0 +1,18 @@
+from macro.idle_gap_compressor import IdleGapCompressor
+
+def _compress(actions:list[tuple[str, str, float]], max_gap:float) -> list[float]:
+    compress = IdleGapCompressor(max_gap)
+    return [compress(type, input, timestamp) for type, input, timestamp in actions]
+
+def test_cuts_idle_gaps():
+    actions = [("key_down", "a", 0.0), ("key_up", "a", 0.25), ("key_down", "b", 10.25), ("key_up", "b", 10.5)]
+    assert _compress(actions, 1.0) == [0.0, 0.25, 1.25, 1.5]
+
+def test_keeps_gaps_while_held():
+    actions = [("key_down", "a", 0.0), ("key_up", "a", 5.0), ("key_down", "b", 5.5)]
+    assert _compress(actions, 1.0) == [0.0, 5.0, 5.5]
+
+def test_stuck_input_stops_blocking_compression():
+    limit = IdleGapCompressor.MAX_HOLD
+    actions = [("key_down", "a", 0.0), ("key_down", "b", limit + 1.0), ("key_up", "b", limit + 1.5), ("key_down", "c", limit + 11.5)]
+    assert _compress(actions, 1.0) == [0.0, 1.0, 1.5, 2.5] #"a" never comes up
\ No newline at end of file
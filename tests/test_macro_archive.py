@@ -0,0 +1,49 @@
+import os
+import pytest
+from library import MacroLibrary
+from library.macro_archive import iter_archive, read_archive_names
+from library.persistence import PersistenceWorker
+from macro import ActionStore, str_to_key
+
+def _store(timestamps:list[float]) -> ActionStore:
+    key = str_to_key("a")
+    store = ActionStore()
+    for timestamp in timestamps:
+        store.append_values("key_down", key, timestamp)
+    return store
+
+def test_archive_round_trips_timestamps(tmp_path):
+    library = MacroLibrary(str(tmp_path / "saves"), writer=PersistenceWorker())
+    timestamps = [0.0, 0.1, 1.234567, 3.3, 123.456789]
+    library.save_macro(_store(timestamps), "exact")
+    archive = str(tmp_path / "all.macroarchive")
+    assert library.export_archive(archive) == 1
+    [(name, store)] = iter_archive(archive)
+    assert list(store.timestamps) == timestamps
+
+def test_export_skips_damaged_saves(tmp_path):
+    library = MacroLibrary(str(tmp_path / "saves"), writer=PersistenceWorker())
+    library.save_macro(_store([0.0, 1.0]), "good")
+    library.save_macro(_store([0.0, 1.0]), "damaged")
+    library.flush()
+    with open(library.index["damaged"], 'r+b') as file:
+        file.truncate(os.path.getsize(library.index["damaged"]) - 4)
+    archive = str(tmp_path / "all.macroarchive")
+    assert library.export_archive(archive) == 1
+    assert read_archive_names(archive) == ["good"]
+
+def test_failed_export_keeps_previous_archive(tmp_path, monkeypatch):
+    library = MacroLibrary(str(tmp_path / "saves"), writer=PersistenceWorker())
+    library.save_macro(_store([0.0]), "first")
+    archive = str(tmp_path / "all.macroarchive")
+    library.export_archive(archive)
+    with open(archive, 'rb') as file:
+        previous = file.read()
+    def fail(name):
+        raise RuntimeError("disk gone")
+    monkeypatch.setattr(library, "retrieve_macro", fail)
+    with pytest.raises(RuntimeError):
+        library.export_archive(archive)
+    with open(archive, 'rb') as file:
+        assert file.read() == previous
+    assert sorted(os.listdir(tmp_path)) == ["all.macroarchive", "saves"]
\ No newline at end of file
@@ -0,0 +1,49 @@
+import os
+from library import MacroLibrary
+from library.persistence import PersistenceWorker
+from macro import ActionStore, str_to_key
+from pynput import mouse
+
+def _store() -> ActionStore:
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_down", key, 0.0)
+    store.append_values("mouse_move", None, 0.25, (-3, 7))
+    store.append_values("mouse_down", mouse.Button.left, 0.5, (10, 20))
+    store.append_values("mouse_up", mouse.Button.left, 0.75)
+    store.append_values("key_up", key, 1.125)
+    store.settings = {"speed": 1.5, "max_idle_gap": 0.2}
+    return store
+
+def _contents(store:ActionStore) -> list:
+    return [(store.type_at(index), store.input_at(index), store.timestamps[index], store.location_at(index)) for index in range(len(store))]
+
+def _library(folder) -> MacroLibrary:
+    return MacroLibrary(str(folder), writer=PersistenceWorker())
+
+def test_binary_and_json_round_trip_alike(tmp_path):
+    library = _library(tmp_path)
+    library.save_macro(_store(), "binary")
+    library.export_json("binary", str(tmp_path / "legacy.json"))
+    library.flush() #a second library must not race this one's writes
+    library = _library(tmp_path)
+    binary, legacy = library.retrieve_macro("binary"), library.retrieve_macro("legacy")
+    assert _contents(binary) == _contents(legacy) == _contents(_store())
+    assert binary.settings == legacy.settings == _store().settings
+
+def test_migration_is_explicit_and_keeps_originals(tmp_path):
+    library = _library(tmp_path)
+    library.save_macro(_store(), "binary")
+    library.export_json("binary", str(tmp_path / "legacy.json"))
+    library.flush() #a second library must not race this one's writes
+    library = _library(tmp_path)
+    assert library.json_saves() == ["legacy"]
+    assert library.migrate_json_saves() == 1
+    assert library.json_saves() == []
+    assert os.path.exists(tmp_path / f'legacy.json{MacroLibrary.BACKUP_SUFFIX}')
+    assert not os.path.exists(tmp_path / "legacy.json")
+    library.flush()
+    library = _library(tmp_path)
+    assert sorted(library.index) == ["binary", "legacy"]
+    assert _contents(library.retrieve_macro("legacy")) == _contents(_store())
+    assert library.retrieve_macro("legacy").settings == _store().settings
\ No newline at end of file
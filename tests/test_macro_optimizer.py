@@ -0,0 +1,63 @@
+from macro import ActionManager, ActionStore, VirtualClock, str_to_key
+from macro.macro_optimizer import merge_same_timestamp, balance_pairs, elide_redundant_moves
+from pynput import mouse
+
+def test_merge_keeps_non_adjacent_duplicates():
+    key = str_to_key("a")
+    store = ActionStore()
+    for type in ("key_down", "key_up", "key_down"):
+        store.append_values(type, key, 1.0)
+    assert merge_same_timestamp(store) == 0
+    assert [store.type_at(index) for index in range(len(store))] == ["key_down", "key_up", "key_down"]
+
+def test_merge_keeps_last_move():
+    store = ActionStore()
+    for location in ((1, 1), (2, 2), (1, 1)):
+        store.append_values("mouse_move", None, 1.0, location)
+    store.append_values("mouse_down", mouse.Button.left, 1.0)
+    assert merge_same_timestamp(store) == 2
+    assert [store.location_at(index) for index in range(len(store))] == [(1, 1), None]
+
+def test_balance_drops_unmatched_ups():
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_up", key, 0.0)
+    store.append_values("key_down", key, 1.0)
+    store.append_values("key_up", key, 2.0)
+    store.append_values("mouse_down", mouse.Button.left, 3.0)
+    store.append_values("mouse_down", mouse.Button.left, 4.0)
+    store.append_values("mouse_up", mouse.Button.left, 5.0)
+    assert balance_pairs(store) == 2
+    assert [store.type_at(index) for index in range(len(store))] == ["key_down", "key_up", "mouse_down", "mouse_up"]
+
+def test_balance_keeps_ups_of_the_previous_iteration():
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_up", key, 0.0) #releases the key held at the end of the previous iteration
+    store.append_values("mouse_up", mouse.Button.left, 0.5)
+    store.append_values("mouse_down", mouse.Button.left, 0.6)
+    store.append_values("key_down", key, 1.0)
+    assert balance_pairs(store) == 0
+    manager = ActionManager(store)
+    manager.looping = True
+    events = VirtualClock().simulate(manager, until=3.5)
+    held = set()
+    for time, name, args in events:
+        if name.endswith("_down") or name == "mouse_down_at":
+            held.add(args[0])
+        elif name.endswith("_up") or name == "mouse_up_at":
+            assert args[0] in held or time < 1.0 #only the first iteration has nothing to release
+            held.discard(args[0])
+    assert not held
+
+def test_elide_keeps_click_locations():
+    store = ActionStore()
+    store.append_values("mouse_move", None, 0.0, (10, 10))
+    store.append_values("mouse_move", None, 1.0, (10, 10))
+    store.append_values("mouse_down", mouse.Button.left, 2.0, (10, 10))
+    store.append_values("mouse_up", mouse.Button.left, 3.0, (10, 10))
+    store.append_values("mouse_move", None, 4.0, (10, 10))
+    store.append_values("mouse_move", None, 5.0, (20, 20))
+    assert elide_redundant_moves(store) == 2
+    assert [(store.type_at(index), store.location_at(index)) for index in range(len(store))] == [
+        ("mouse_move", (10, 10)), ("mouse_down", (10, 10)), ("mouse_up", (10, 10)), ("mouse_move", (20, 20))]
\ No newline at end of file
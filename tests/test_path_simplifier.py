@@ -0,0 +1,17 @@
+from recording import ActionRecorder, MoveSamplingPolicy, simplify_path, fill_time_gaps
+from recording.action_recorder import MOUSE_MOVE
+
+def test_fill_time_gaps_bounds_steps():
+    timestamps = [index * 10 for index in range(101)]
+    assert fill_time_gaps(timestamps, [0, 100], 50) == list(range(0, 101, 5))
+
+def test_fill_time_gaps_keeps_vertices():
+    timestamps = [0, 10, 20, 1000]
+    assert fill_time_gaps(timestamps, [0, 2, 3], 50) == [0, 2, 3] #a recorded gap can't be filled
+
+def test_straight_drag_keeps_points_along_the_path():
+    recorder = ActionRecorder(record_moves=True, move_policy=MoveSamplingPolicy(max_step=0.1))
+    events = [(index * 10_000_000, MOUSE_MOVE, None, index, index) for index in range(51)] #one pixel per 10ms
+    assert simplify_path([event[3] for event in events], [event[4] for event in events], 1.0) == [0, 50]
+    kept = recorder._simplify_moves(events)
+    assert [event[3] for event in kept] == list(range(0, 51, 10))
\ No newline at end of file
@@ -0,0 +1,79 @@
+from macro import ActionManager, ActionStore, VirtualClock, str_to_key
+
+class StallingClock(VirtualClock):
+    '''VirtualClock that wakes up stall seconds late once, like a process suspended mid playback.'''
+
+    def __init__(self, stall_at:float, stall:float, stop_at:float | None = None):
+        super().__init__(stop_at=stop_at)
+        self.stall_at = stall_at
+        self.stall = stall
+
+    def wait_until(self, deadline, stop_event = None):
+        if self.stall and deadline >= self.stall_at:
+            self.time = deadline + self.stall
+            self.stall = 0.0
+        return super().wait_until(deadline, stop_event)
+
+def _looping_manager() -> ActionManager:
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_down", key, 0.0)
+    store.append_values("key_up", key, 0.5)
+    manager = ActionManager(store)
+    manager.looping = True
+    return manager
+
+def _times(events:list) -> list[float]:
+    return [time for time, name, args in events]
+
+def test_loop_stall_skips_missed_iterations():
+    events = StallingClock(stall_at=1.0, stall=100.0).simulate(_looping_manager(), until=102.0)
+    assert _times(events) == [0.0, 0.5, 0.5, 101.0, 101.0, 101.5, 101.5, 102.0, 102.0, 102.0]
+    assert events[-1][1] == "key_up" #released when stopped
+
+def test_small_loop_lateness_keeps_schedule():
+    events = StallingClock(stall_at=1.0, stall=0.2).simulate(_looping_manager(), until=2.0)
+    assert _times(events) == [0.0, 0.5, 0.5, 1.2, 1.2, 1.5, 1.5, 2.0, 2.0, 2.0]
+
+def test_looping_iterations_do_not_drift():
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_down", key, 0.0)
+    store.append_values("key_up", key, 0.1)
+    store.append_values("key_up", key, 0.3)
+    manager = ActionManager(store)
+    manager.looping = True
+    downs = [time for time, name, args in VirtualClock().simulate(manager, until=299.95) if name == "key_down"]
+    assert len(downs) == 1000
+    assert all(abs(time - loop * 0.3) < 1e-9 for loop, time in enumerate(downs))
+
+def test_speed_change_recompiles_plan():
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_down", key, 1.0)
+    store.append_values("key_up", key, 3.0)
+    manager = ActionManager(store)
+    assert _times(VirtualClock().simulate(manager)) == [1.0, 3.0]
+    manager.speed = 2.0
+    assert _times(VirtualClock().simulate(manager)) == [0.5, 1.5]
+
+def test_stop_releases_held_inputs():
+    key = str_to_key("a")
+    store = ActionStore()
+    store.append_values("key_down", key, 1.0)
+    store.append_values("key_up", key, 5.0)
+    events = VirtualClock().simulate(ActionManager(store), until=2.0)
+    assert [(time, name) for time, name, args in events] == [(1.0, "key_down"), (2.0, "key_up")]
+
+def test_stream_plays_like_the_plan():
+    manager = _looping_manager()
+    actions = list(manager.save)
+    published = []
+    manager.subscribe(lambda event: published.append((event.kind, event.index, event.loop, event.lateness)))
+    planned = StallingClock(stall_at=1.0, stall=100.0).simulate(manager, until=102.0)
+    planned_events, published[:] = published[1:], [] #"started" differs, the stream doesn't know its duration
+    streamed = StallingClock(stall_at=1.0, stall=100.0).simulate(manager, until=102.0, source=lambda: iter(actions))
+    assert streamed == planned
+    assert published[1:] == planned_events
+    assert ("action", 1, 1, 100.0) in planned_events
+    assert list(manager.lateness) == [0.0, 0.0]
\ No newline at end of file